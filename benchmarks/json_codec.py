@@ -0,0 +1,55 @@
+# coding: utf-8
+"""
+Бенчмарк JSON-кодеков из pynch.util.JSON_CODECS.
+
+Сравнивает кодеки на типичных данных: ответ read на 1000 записей,
+тело запроса bulk_update и параметры filter/sort.
+Запуск: python benchmarks/json_codec.py
+"""
+
+import timeit
+
+from pynch.util import JSON_CODECS
+
+
+ROWS = [
+    {
+        'id': i,
+        'name': 'Запись №%d' % i,
+        'email': 'user%d@example.com' % i,
+        'is_active': i % 2 == 0,
+        'created': '01/%02d/2015' % (i % 28 + 1),
+        'master_id': i // 10,
+    }
+    for i in range(1000)
+]
+
+FILTER = (
+    '[{"property": "name", "operator": "like", "value": "abc"}, '
+    '{"property": "master_id", "operator": "in", "value": [1, 2, 3]}]'
+)
+
+
+def run(number=200):
+    """Выводит время операций для каждого доступного кодека в мс."""
+    for name, codec_clz in sorted(JSON_CODECS.items()):
+        try:
+            codec = codec_clz()
+        except RuntimeError as e:
+            print('%-8s skipped: %s' % (name, e))
+            continue
+        request = codec.dumps({'records': ROWS})
+        cases = (
+            ('dumps read(1000)', lambda: codec.dumps(
+                {'data': map(dict, ROWS), 'success': True})),
+            ('loads update(1000)', lambda: codec.loads(request)),
+            ('loads filter', lambda: codec.loads(FILTER)),
+        )
+        for case, fn in cases:
+            total = timeit.timeit(fn, number=number)
+            print('%-8s %-20s: %.4f ms' % (
+                name, case, total / number * 1000))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,51 @@
+# coding: utf-8
+"""
+Микро-бенчмарк накладных расходов стека middleware в API.
+
+Сравнивает вложенные _Wrappable-обёртки и цепочку, собранную
+однократно (compiled), для 0, 3 и 10 middleware. Обе цепочки состоят
+из тех же вызовов middleware, compiled лишь убирает слои _Wrappable
+и _initialize, поэтому разница постоянна и не растёт с числом MW. Запуск: python benchmarks/middleware.py
+"""
+
+import timeit
+
+from pynch.core import API
+
+
+class _Container:
+
+    class Controller:
+
+        @staticmethod
+        def action(**kwargs):
+            return kwargs
+
+    def get(self, group, name):
+        return self.Controller
+
+
+def _pass_through(nxt, controller, action, **params):
+    return nxt(controller, action, **params)
+
+
+def run(number=100000):
+    """Выводит время одного вызова API в микросекундах."""
+    for count in (0, 3, 10):
+        middleware = [_pass_through] * count
+        for mode in ('wrapped', 'compiled'):
+            api = API(
+                container=_Container(),
+                middleware=middleware,
+                compiled=mode == 'compiled'
+            )
+            total = timeit.timeit(
+                lambda: api.call('Controller', 'action', a=1),
+                number=number
+            )
+            print('%2d middleware, %-8s: %.3f us/call' % (
+                count, mode, total / number * 10 ** 6))
+
+
+if __name__ == '__main__':
+    run()
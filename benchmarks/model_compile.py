@@ -0,0 +1,75 @@
+# coding: utf-8
+"""
+Бенчмарк кэширования компиляции запросов модели.
+
+Сравнивает построение и выполнение запроса read для модели detail
+(соединение с master) из тестовой схемы: обычный Query, который
+компилируется при каждом выполнении, и baked-запрос по шаблону.
+Запуск: PYTHONPATH=src python benchmarks/model_compile.py
+"""
+
+import logging
+import os
+import timeit
+
+from sqlalchemy.sql.compiler import SQLCompiler
+
+from pynch.core import init
+from pynch.service import _QuerySetBuilder
+
+
+CONTAINER = os.path.join(
+    os.path.dirname(__file__), os.pardir,
+    'src', 'pynch', 'tests', 'api', 'container.json')
+
+
+def _queue(i):
+    return [
+        ('_filters', ([{
+            'property': 'master.name',
+            'operator': 'eq',
+            'value': 'master %d' % (i % 10)
+        }],), {}),
+        ('_sorts', ([{'property': 'id', 'direction': 'ASC'}],), {}),
+        ('_limit', (0, 20), {}),
+    ]
+
+
+def run(number=2000):
+    """Выводит время одного запроса в мс и кол-во компиляций."""
+    api = init(config=CONTAINER).api
+    # InMemory-сессия логирует запросы (echo=True)
+    logging.disable(logging.INFO)
+    for i in range(10):
+        master = api.call(
+            'Master', 'create', data={'name': 'master %d' % i})
+        for j in range(20):
+            api.call('Detail', 'create', data={
+                'name': 'detail %d' % j, 'master_id': master['id']})
+    model = api._container.get('model', 'detail')
+
+    compiled = [0]
+    compiler_init = SQLCompiler.__init__
+
+    def counting_init(self, *args, **kwargs):
+        compiled[0] += 1
+        compiler_init(self, *args, **kwargs)
+
+    SQLCompiler.__init__ = counting_init
+    try:
+        for mode, operation in (('query', None), ('baked', '_read')):
+            counter = iter(range(number * 2))
+            compiled[0] = 0
+            total = timeit.timeit(
+                lambda: _QuerySetBuilder(model).build(
+                    _queue(next(counter)), operation=operation).all(),
+                number=number
+            )
+            print('%-6s: %.4f ms/query, %d compilations' % (
+                mode, total / number * 10 ** 3, compiled[0]))
+    finally:
+        SQLCompiler.__init__ = compiler_init
+
+
+if __name__ == '__main__':
+    run()
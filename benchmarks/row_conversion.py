@@ -0,0 +1,62 @@
+# coding: utf-8
+"""
+Бенчмарк преобразования строк результата запроса в словари.
+
+Сравнивает построчное преобразование (to_dict + View.from_record)
+и преобразование порциями (View.from_records) на 100000 строк
+с колонкой-датой и исключаемым полем.
+Запуск: PYTHONPATH=src python benchmarks/row_conversion.py
+"""
+
+import timeit
+from datetime import date
+
+from sqlalchemy import Column, Date, Integer, String
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.util import lightweight_named_tuple
+
+from pynch.adapter import DefaultAdapter
+from pynch.service import Service, View
+
+
+Base = declarative_base()
+
+
+class Record(Base):
+    __tablename__ = 'record'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+    email = Column(String(50))
+    created = Column(Date)
+    comment = Column(String(4000))
+
+
+KEYS = ['id', 'name', 'email', 'created', 'comment']
+
+ROW = lightweight_named_tuple('result', KEYS)
+
+ROWS = [
+    ROW((i, 'name %d' % i, 'user%d@example.com' % i,
+         date(2015, 1, i % 28 + 1), 'comment'))
+    for i in range(100000)
+]
+
+
+def run(number=5):
+    """Выводит время преобразования всех строк в мс."""
+    view = View(
+        (DefaultAdapter(Record, None, ['comment']),), Record)
+    cases = (
+        ('per row', lambda: list(
+            map(view.from_record, map(Service.to_dict, ROWS)))),
+        ('batches', lambda: list(view.from_records(ROWS))),
+    )
+    for case, fn in cases:
+        total = timeit.timeit(fn, number=number)
+        print('%-8s: %.1f ms / %d rows' % (
+            case, total / number * 10 ** 3, len(ROWS)))
+
+
+if __name__ == '__main__':
+    run()
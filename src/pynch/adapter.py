@@ -61,6 +61,15 @@ class Splitter:
         result[self._to_name] = value
         return result, params
 
+    def from_fields(self, fields):
+        """
+        Поля модели, необходимые для преобразования model object -> dict.
+
+        :param list fields: Все поля, выбираемые из модели
+        :return list: Список полей
+        """
+        return self._from_names
+
 
 class DefaultAdapter:
 
@@ -116,6 +125,15 @@ class DefaultAdapter:
         result.update(res)
         return result, params
 
+    def from_fields(self, fields):
+        """
+        Поля модели, необходимые для преобразования model object -> dict.
+
+        :param list fields: Все поля, выбираемые из модели
+        :return list: Список полей
+        """
+        return list(self.include_exclude(dict.fromkeys(fields)))
+
     def include_exclude(self, params):
         """
         Включает/исключает поля из результат.
@@ -41,13 +41,30 @@ class Authentication(Controller, metaclass=Injectable):
         :param web_session_id: Идентификатор сессии
         :return:
         """
-        pass
+        return self.service.logout(_web_session_id)
+
+
+def _allowed(service, uid, perms):
+    # Признаки наличия у пользователя прав на действия (одним запросом)
+    if service is None or uid is None:
+        return None
+    return dict(zip(perms, service.has_perms(uid, perms)))
 
 
 class PermissionController(Controller, metaclass=Injectable):
 
     """Контроллер для списка набора имеющихся контроллеров в системе."""
 
+    def __init__(self, service=None):
+        """.
+
+        :param service: Сервис авторизации. Если указан, а контроллер
+        получает пользователя (preserve_user в MW авторизации), то
+        контроллеры отмечаются признаком allowed - наличием у пользователя
+        прав хотя бы на одно действие контроллера
+        """
+        self.service = service
+
     def read(
         self,
         start: 'int'=None,
@@ -56,7 +73,8 @@ class PermissionController(Controller, metaclass=Injectable):
         query: 'str'=None,
         filter: 'json'=None,
         group: 'str'=None,
-        sort: 'json'=None
+        sort: 'json'=None,
+        _uid=None
     ) -> ("GET", r"/read"):
         """
         Возвращает список всех контроллеров в системе.
@@ -66,7 +84,15 @@ class PermissionController(Controller, metaclass=Injectable):
         ctrl_set = set()
         for ctrl, action in AVAILABLE_ACTIONS:
             ctrl_set.add(ctrl)
-        return map(lambda x: dict(controller=x), sorted(ctrl_set))
+
+        allowed = _allowed(self.service, _uid, AVAILABLE_ACTIONS)
+        if allowed is None:
+            return map(lambda x: dict(controller=x), sorted(ctrl_set))
+
+        allowed_ctrls = {ctrl for (ctrl, _), ok in allowed.items() if ok}
+        return map(
+            lambda x: dict(controller=x, allowed=x in allowed_ctrls),
+            sorted(ctrl_set))
 
 
 class PermissionAction(Controller, metaclass=Injectable):
@@ -75,6 +101,15 @@ class PermissionAction(Controller, metaclass=Injectable):
 
     func_filter = filter
 
+    def __init__(self, service=None):
+        """.
+
+        :param service: Сервис авторизации. Если указан, а контроллер
+        получает пользователя (preserve_user в MW авторизации), то
+        действия отмечаются признаком allowed - наличием прав на них
+        """
+        self.service = service
+
     def read(
         self,
         filter: 'json',
@@ -83,7 +118,8 @@ class PermissionAction(Controller, metaclass=Injectable):
         page: 'int'=None,
         query: 'str'=None,
         group: 'str'=None,
-        sort: 'json'=None
+        sort: 'json'=None,
+        _uid=None
     ) -> ("GET", r"/read"):
         """
         Возвращает список действий одного контроллера.
@@ -96,4 +132,13 @@ class PermissionAction(Controller, metaclass=Injectable):
         for ctrl, action in AVAILABLE_ACTIONS:
             if ctrl == ctrl_param:
                 action_set.add(action)
-        return map(lambda x: dict(action=x), sorted(action_set))
+
+        actions = sorted(action_set)
+        allowed = _allowed(
+            self.service, _uid, [(ctrl_param, x) for x in actions])
+        if allowed is None:
+            return map(lambda x: dict(action=x), actions)
+
+        return map(
+            lambda x: dict(action=x, allowed=allowed[(ctrl_param, x)]),
+            actions)
@@ -4,6 +4,12 @@
 import pynch.exceptions as exc
 
 
+def _pass_session(nxt, controller, action, _web_session_id=None, **params):
+    """Пропускает вызов без проверки, явно передавая _web_session_id."""
+    return nxt(
+        controller, action, _web_session_id=_web_session_id, **params)
+
+
 def authentication(auth, white_list=None):
     """
     MW для аутентификации.
@@ -14,14 +20,13 @@ def authentication(auth, white_list=None):
     :param white_list: Список контроллеров без проверки
     :return: вызов следующей по списку MW
     """
-    bypass = set(white_list or []).__contains__
+    white_list = frozenset(white_list or [])
+    bypass = white_list.__contains__
 
     def wrapper(nxt, controller, action, _web_session_id=None, **params):
         if bypass(controller):
-            return nxt(
-                controller, action, _web_session_id=_web_session_id,
-                **params
-            )
+            return _pass_session(
+                nxt, controller, action, _web_session_id, **params)
         try:
             uid = auth.is_logged_in(web_session_id=_web_session_id)
         except exc.NotFound:
@@ -30,6 +35,10 @@ def authentication(auth, white_list=None):
         params['_context'].setdefault('uid', uid)
         return nxt(controller, action, **params)
 
+    # по white_list API может собрать цепочку middleware, в которой
+    # данная MW заменена на bypass с тем же поведением
+    wrapper.white_list = white_list
+    wrapper.bypass = _pass_session
     return wrapper
 
 
@@ -41,7 +50,8 @@ def authorization(auth, preserve_user=None, white_list=None):
     :param white_list: Список контроллеров без проверки
     :return: вызов следующей по списку MW
     """
-    bypass = set(white_list or []).__contains__
+    white_list = frozenset(white_list or [])
+    bypass = white_list.__contains__
 
     def wrapper(nxt, controller, action, **params):
         if bypass(controller):
@@ -61,4 +71,6 @@ def authorization(auth, preserve_user=None, white_list=None):
                 raise exc.Forbidden(uid, qualified_controller, action)
         return nxt(controller, action, **params)
 
+    # по white_list API может собрать цепочку middleware без данной MW
+    wrapper.white_list = white_list
     return wrapper
@@ -1,8 +1,50 @@
 # coding: utf-8
 """Сервисы для аутентфикации и авторизации."""
+from functools import partial
+
+from sqlalchemy.sql import bindparam, literal_column, true
+
+from pynch.auth.sessions import SessionCache, SQLSessionStore
 from pynch.auth.util import to_md5_hash
 
-from pynch.service import Service
+from pynch.service import Service, on_write
+from pynch.util import TTLCache
+import pynch.exceptions as exc
+
+
+# Максимальное кол-во пользователей в кэше прав
+PERMISSIONS_CACHE_SIZE = 10000
+
+# (конфигурация модели, пользователь) -> (признак суперроли,
+# множество пар (контроллер, действие))
+_permissions = TTLCache(size=PERMISSIONS_CACHE_SIZE)
+
+# Таблицы, изменение которых через сервисы сбрасывает кэш прав
+_permission_tables = set()
+
+
+# Кэши сессий по умолчанию: конфигурация модели сессий -> SessionCache
+_session_caches = {}
+
+# Максимальное кол-во кэшей сессий по умолчанию
+SESSION_CACHES_SIZE = 256
+
+
+@on_write
+def _invalidate_permissions(table):
+    if table in _permission_tables:
+        _permissions.clear()
+
+
+def _default_session_cache(model, ttl):
+    # Кэш сессий процесса, общий для сервисов с одной моделью сессий
+    key = (model.cache_key, ttl)
+    cache = _session_caches.get(key)
+    if cache is None:
+        if len(_session_caches) >= SESSION_CACHES_SIZE:
+            _session_caches.clear()
+        cache = _session_caches[key] = SessionCache(ttl=ttl)
+    return cache
 
 
 class AuthenticationService(Service):
@@ -13,16 +55,34 @@ class AuthenticationService(Service):
         'md5': to_md5_hash
     }
 
-    def __init__(self, user_model, hash=None, **kwargs):
+    def __init__(self, user_model, hash=None, session_store=None,
+                 session_cache=None, session_ttl=0, **kwargs):
         """.
 
         :param user_model: Ссылка на модель пользователей
+        :param session_store: Хранилище сессий (MemorySessionStore,
+        FileSessionStore), по умолчанию - таблица модели сервиса
+        :param session_cache: Кэш сессий (например, SharedSessionCache
+        для процессов одного хоста), по умолчанию - кэш в памяти процесса
+        для хранилища в таблице, если указан session_ttl
+        :param session_ttl: Время жизни сессии в кэше по умолчанию
+        в секундах, 0 (по умолчанию) - сессии не кэшируются. Кэш в памяти
+        процесса обновляется при входе/выходе только в текущем процессе,
+        остальные процессы могут принимать завершенную сессию
+        до session_ttl секунд
         :param dict kwargs: Доп. необходимые параметры
         :return:
         """
         super().__init__(**kwargs)
         self.method = self.METHODS[hash]
         self.user_model = user_model
+        if session_store is None:
+            session_store = SQLSessionStore(self)
+            if session_cache is None and session_ttl:
+                session_cache = _default_session_cache(
+                    self._model, session_ttl)
+        self.session_store = session_store
+        self.session_cache = session_cache
 
     def login(self, login, password, web_session_id):
         """
@@ -43,13 +103,16 @@ class AuthenticationService(Service):
 
         user_id = obj.get('id')
         if user_id:
-            self.filter(
-                'user_id', 'eq', user_id
-            ).delete()
+            self.session_store.create(web_session_id, user_id)
 
-            self.create(
-                user_id=user_id,
-                web_session_id=web_session_id)
+            cache = self.session_cache
+            if cache is not None:
+                def cache_session():
+                    # прежние сессии пользователя удалены
+                    cache.discard_user(user_id)
+                    cache.set(web_session_id, user_id)
+
+                self._after_commit(cache_session)
 
         return user_id is not None
 
@@ -60,31 +123,62 @@ class AuthenticationService(Service):
         :param str web_session_id: Идентификатор сессии
         :return bool: Удалось ли разлогиниться
         """
-        pass
+        if self.session_cache is not None:
+            self._after_commit(
+                partial(self.session_cache.discard, web_session_id))
+
+        return self.session_store.delete(web_session_id)
 
     def is_logged_in(self, web_session_id):
         """
         Процедура проверки, залогинен ли пользователь.
 
+        Пользователь сессии берется из кэша, если он есть.
+        Кэш заполняется и очищается после фиксации транзакции
         :param str web_session_id:  Идентификатор сессии
         :return int: Идентификатор пользователя
         """
-        obj = self.filter('web_session_id', 'eq', web_session_id).get()
-        return obj.get('user_id')
+        cache = self.session_cache
+        if cache is not None and web_session_id is not None:
+            uid = cache.get(web_session_id)
+            if uid is not None:
+                return uid
+
+        uid = self.session_store.get(web_session_id)
+        if uid is None:
+            raise exc.NotFound()
+
+        if cache is not None and web_session_id is not None:
+            self._after_commit(partial(cache.set, web_session_id, uid))
+        return uid
 
 
 class AuthorizationService(Service):
     """Сервис авторизации."""
 
-    def __init__(self, user_role, **kwargs):
+    def __init__(self, user_role, perm_ttl=0, **kwargs):
         """.
 
         :param user_role: Ссылка на модель пользователей
+        :param perm_ttl: Время кэширования прав пользователя в секундах,
+        0 (по умолчанию) - права проверяются запросами при каждом вызове.
+        Кэш сбрасывается после фиксации изменений ролей и прав только
+        в текущем процессе, остальные процессы увидят изменения
+        не позднее чем через perm_ttl секунд
         :param dict kwargs: Доп. необходимые параметры
         :return:
         """
         super().__init__(**kwargs)
         self.user_role = user_role
+        self.perm_ttl = perm_ttl
+        if perm_ttl:
+            # права зависят от связей пользователей с ролями, ролей
+            # и прав ролей, но не от данных самих пользователей
+            field = self._model.get_field
+            _permission_tables.update(
+                field(name).class_.__table__.name
+                for name in ('user_id', 'role.is_super', 'permission.role_id')
+            )
 
     def has_perm(self, uid, controller, action):
         """
@@ -95,21 +189,102 @@ class AuthorizationService(Service):
         :param str action: Действие
         :return bool: Есть ли право выполнения
         """
-        perm_service = self.filter(
-            'user_id', 'eq', uid
-        ).filter(
-            'permission.controller', 'eq', controller
+        if not self.perm_ttl:
+            return self._has_perm(uid, controller, action)
+
+        is_super, perms = self.permissions(uid)
+        return is_super or (controller, action) in perms
+
+    def has_perms(self, uid, perms):
+        """
+        Проверка прав на список действий одним запросом.
+
+        :param int uid: Идентификатор пользователя
+        :param list perms: Список пар (контроллер, действие)
+        :return list: Признаки наличия прав в порядке следования пар
+        """
+        is_super, user_perms = self.permissions(uid)
+        return [is_super or tuple(perm) in user_perms for perm in perms]
+
+    def permissions(self, uid):
+        """
+        Права пользователя.
+
+        Права загружаются одним запросом и кэшируются на perm_ttl секунд,
+        кэш сбрасывается после фиксации изменений таблиц ролей и прав
+        через сервисы
+        :param int uid: Идентификатор пользователя
+        :return tuple: (Признак суперроли,
+        множество пар (контроллер, действие))
+        """
+        if not self.perm_ttl:
+            return self._load_permissions(uid)
+
+        key = (self._model.cache_key, uid)
+        result = _permissions.get(key)
+        if result is None:
+            result = self._load_permissions(uid)
+            _permissions.set(key, result, self.perm_ttl)
+        return result
+
+    def _load_permissions(self, uid):
+        # Роли пользователя с правами ролей (роль может не иметь прав)
+        rows = self.user_role.bake(
+            ('auth.permissions', self._model.cache_key),
+            self._permissions_query
+        )(
+            self._model.create_query().session
+        ).params(uid=uid).all()
+
+        is_super = any(is_super for is_super, _, _ in rows)
+        perms = frozenset(
+            (controller, action)
+            for _, controller, action in rows
+            if controller is not None
+        )
+        return is_super, perms
+
+    def _permissions_query(self, qs):
+        # Запрос ролей пользователя :uid с правами ролей
+        field = self._model.get_field
+        permission_role = field('permission.role_id')
+        return qs.outerjoin(
+            permission_role.class_, permission_role == field('role_id')
+        ).with_entities(
+            field('role.is_super'),
+            field('permission.controller'),
+            field('permission.action')
         ).filter(
-            'permission.action', 'eq', action)
-
-        role_service = self(self.user_role).filter(
-            'user_id', 'eq', uid
-        ).filter('role.is_super', 'eq', True)
-
-        # TODO: придумать нормальный способ
-        # получения данных в один маленький запрос
-        # Объединение результатов
-        # subquery = service._qs.union(role_service._qs).exists()
-        # res = self.session.query(literal(True)).filter(subquery)
-        # return res.scalar()
-        return perm_service.exists() or role_service.exists() or False
+            field('user_id') == bindparam('uid')
+        )
+
+    def _has_perm(self, uid, controller, action):
+        # Проверка прав одним запросом EXISTS (... UNION ALL ...),
+        # который строится и компилируется один раз
+        return self._model.bake(
+            ('auth.has_perm', self.user_role.cache_key),
+            self._has_perm_query
+        )(
+            self._model.create_query().session
+        ).params(
+            uid=uid, controller=controller, action=action
+        ).scalar()
+
+    def _has_perm_query(self, qs):
+        # Запрос наличия у пользователя :uid права на действие
+        # :controller/:action или суперроли
+        field = self._model.get_field
+        one = literal_column('1')
+
+        perm_qs = qs.with_entities(one).filter(
+            field('user_id') == bindparam('uid'),
+            field('permission.controller') == bindparam('controller'),
+            field('permission.action') == bindparam('action'))
+
+        role_qs = self.user_role.create_query().with_session(
+            qs.session
+        ).with_entities(one).filter(
+            field('user_id') == bindparam('uid'),
+            field('role.is_super') == true())
+
+        return qs.session.query(perm_qs.union_all(role_qs).exists())
@@ -0,0 +1,303 @@
+# coding: utf-8
+"""
+Хранилища сессий и их кэши (web_session_id -> uid).
+
+Хранилище (SessionStore) - источник сессий для сервиса аутентификации,
+кэш (SessionCache) - ускоряет проверку сессий перед обращением к нему
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from pynch.util import TTLCache
+import pynch.exceptions as exc
+
+
+class SessionStore:
+
+    """
+    Интерфейс хранилища сессий.
+
+    У пользователя может быть только одна сессия
+    """
+
+    def get(self, web_session_id):
+        """Возвращает пользователя сессии или None."""
+        raise NotImplementedError()
+
+    def create(self, web_session_id, uid):
+        """Создает сессию пользователя, удаляя его прежние сессии."""
+        raise NotImplementedError()
+
+    def delete(self, web_session_id):
+        """Удаляет сессию, возвращает признак ее наличия."""
+        raise NotImplementedError()
+
+
+class SQLSessionStore(SessionStore):
+
+    """Хранилище сессий в таблице БД (модели сервиса аутентификации)."""
+
+    def __init__(self, service):
+        """.
+
+        :param service: Сервис с моделью таблицы сессий
+        """
+        self._service = service
+
+    def get(self, web_session_id):
+        """См. SessionStore.get."""
+        try:
+            obj = self._service.filter(
+                'web_session_id', 'eq', web_session_id).get()
+        except exc.NotFound:
+            return None
+        return obj.get('user_id')
+
+    def create(self, web_session_id, uid):
+        """См. SessionStore.create."""
+        # прежняя сессия пользователя заменяется одним запросом
+        # (при уникальном ограничении по user_id, иначе - DELETE + INSERT)
+        self._service.upsert(
+            ('user_id',), user_id=uid, web_session_id=web_session_id)
+
+    def delete(self, web_session_id):
+        """См. SessionStore.delete."""
+        session = self._service.filter(
+            'web_session_id', 'eq', web_session_id)
+        if not session.exists():
+            return False
+        session.delete()
+        return True
+
+
+class MemorySessionStore(SessionStore):
+
+    """Хранилище сессий в памяти процесса."""
+
+    def __init__(self):
+        """."""
+        self._uids = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, web_session_id):
+        """См. SessionStore.get."""
+        return self._uids.get(web_session_id)
+
+    def create(self, web_session_id, uid):
+        """См. SessionStore.create."""
+        with self._lock:
+            self._delete(self._sessions.get(uid))
+            self._delete(web_session_id)
+            self._uids[web_session_id] = uid
+            self._sessions[uid] = web_session_id
+
+    def delete(self, web_session_id):
+        """См. SessionStore.delete."""
+        with self._lock:
+            return self._delete(web_session_id)
+
+    def _delete(self, web_session_id):
+        uid = self._uids.pop(web_session_id, None)
+        if uid is None:
+            return False
+        del self._sessions[uid]
+        return True
+
+
+class _SQLiteFile:
+
+    """
+    Таблица в локальном файле sqlite (режим WAL) с соединением на поток.
+
+    Соединения открываются при первом обращении и принадлежат процессу,
+    открывшему их: процесс, порождённый fork (например, рабочий процесс
+    gunicorn/uwsgi с preload), открывает собственные соединения
+    """
+
+    # DDL таблицы и индексов
+    SCHEMA = ()
+
+    def __init__(self, path):
+        """.
+
+        :param path: Путь до файла (допускаются переменные окружения)
+        """
+        self.path = os.path.expandvars(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение для текущего потока текущего процесса
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            # соединение, унаследованное от родительского процесса,
+            # не используется (и не закрывается) - sqlite это запрещает
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+            self._local.conn, self._local.pid = conn, pid
+        return self._local.conn
+
+
+class FileSessionStore(_SQLiteFile, SessionStore):
+
+    """
+    Хранилище сессий в локальном файле (sqlite в режиме WAL).
+
+    Используется процессами одного хоста совместно
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS web_sessions ('
+        'web_session_id TEXT PRIMARY KEY, '
+        'uid INTEGER NOT NULL UNIQUE)',
+    )
+
+    def get(self, web_session_id):
+        """См. SessionStore.get."""
+        row = self._connection().execute(
+            'SELECT uid FROM web_sessions WHERE web_session_id = ?',
+            (web_session_id,)
+        ).fetchone()
+        return row and row[0]
+
+    def create(self, web_session_id, uid):
+        """См. SessionStore.create."""
+        # конфликт по web_session_id или uid заменяет прежнюю сессию
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO web_sessions VALUES (?, ?)',
+                (web_session_id, uid))
+
+    def delete(self, web_session_id):
+        """См. SessionStore.delete."""
+        with self._connection() as conn:
+            return conn.execute(
+                'DELETE FROM web_sessions WHERE web_session_id = ?',
+                (web_session_id,)
+            ).rowcount > 0
+
+
+class SessionCache:
+
+    """
+    Кэш сессий в памяти процесса.
+
+    LRU с ограниченным временем жизни записей. Для удаления всех
+    сессий пользователя хранится обратное соответствие uid -> сессии
+    """
+
+    def __init__(self, size=10000, ttl=60):
+        """.
+
+        :param size: Максимальное кол-во сессий
+        :param ttl: Время жизни записи в секундах
+        """
+        self._uids = TTLCache(size=size, ttl=ttl)
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, web_session_id):
+        """Возвращает пользователя сессии или None."""
+        return self._uids.get(web_session_id)
+
+    def set(self, web_session_id, uid):
+        """Сохраняет пользователя сессии."""
+        self._uids.set(web_session_id, uid)
+        with self._lock:
+            self._sessions.setdefault(uid, set()).add(web_session_id)
+            if len(self._sessions) > self._uids.size:
+                self._prune()
+
+    def discard(self, web_session_id):
+        """Удаляет сессию."""
+        uid = self._uids.get(web_session_id)
+        self._uids.pop(web_session_id)
+        with self._lock:
+            self._sessions.get(uid, set()).discard(web_session_id)
+
+    def discard_user(self, uid):
+        """Удаляет все сессии пользователя."""
+        with self._lock:
+            sessions = self._sessions.pop(uid, ())
+        for web_session_id in sessions:
+            self._uids.pop(web_session_id)
+
+    def _prune(self):
+        # Удаление из обратного соответствия вытесненных сессий
+        sessions = {}
+        for uid, ids in self._sessions.items():
+            ids = {i for i in ids if self._uids.get(i) == uid}
+            if ids:
+                sessions[uid] = ids
+        self._sessions = sessions
+
+
+class SharedSessionCache(_SQLiteFile):
+
+    """
+    Кэш сессий в локальном файле (sqlite в режиме WAL).
+
+    Используется процессами одного хоста совместно, поэтому
+    вход/выход в одном процессе сразу виден остальным
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS sessions ('
+        'web_session_id TEXT PRIMARY KEY, '
+        'uid INTEGER NOT NULL, '
+        'expires REAL NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS sessions_uid ON sessions (uid)',
+    )
+
+    def __init__(self, path, ttl=60):
+        """.
+
+        :param path: Путь до файла кэша (допускаются переменные окружения)
+        :param ttl: Время жизни записи в секундах
+        """
+        super().__init__(path)
+        self.ttl = ttl
+
+    def get(self, web_session_id):
+        """Возвращает пользователя сессии или None."""
+        row = self._connection().execute(
+            'SELECT uid FROM sessions '
+            'WHERE web_session_id = ? AND expires > ?',
+            (web_session_id, time.time())
+        ).fetchone()
+        return row and row[0]
+
+    def set(self, web_session_id, uid):
+        """Сохраняет пользователя сессии."""
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)',
+                (web_session_id, uid, time.time() + self.ttl))
+
+    def discard(self, web_session_id):
+        """Удаляет сессию."""
+        with self._connection() as conn:
+            conn.execute(
+                'DELETE FROM sessions WHERE web_session_id = ?',
+                (web_session_id,))
+
+    def discard_user(self, uid):
+        """Удаляет все сессии пользователя."""
+        with self._connection() as conn:
+            conn.execute('DELETE FROM sessions WHERE uid = ?', (uid,))
+            # заодно удаляются устаревшие записи
+            conn.execute(
+                'DELETE FROM sessions WHERE expires <= ?', (time.time(),))
+
+
+__all__ = (
+    'SessionStore', 'SQLSessionStore', 'MemorySessionStore',
+    'FileSessionStore', 'SessionCache', 'SharedSessionCache'
+)
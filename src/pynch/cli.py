@@ -2,10 +2,9 @@
 """Autocomplete CLI for controllers/actions."""
 
 import sys
-import json
 
 from pynch.accli import AutoCompleteCLI
-from pynch.util import get_config_from_env
+from pynch.util import get_config_from_env, get_json_codec
 from pynch.core import init
 
 
@@ -28,7 +27,8 @@ class APICLI(AutoCompleteCLI):
     def _call(self, args):
         ctl, action, param = (args + ["{}"])[:3]
         res = self.fend.api.call(ctl, action, **eval(param))
-        self._out(json.dumps(res, indent=2, default=tuple))
+        self._out(get_json_codec().dumps(
+            res, default=tuple, pretty=True).decode('utf-8'))
 
 
 if __name__ == '__main__':
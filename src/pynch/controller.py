@@ -35,7 +35,9 @@ class DictController(Controller, metaclass=Injectable):
         query: 'str'=None,
         filter: 'json'=None,
         group: 'str'=None,
-        sort: 'json'=None
+        sort: 'json'=None,
+        cursor: 'str'=None,
+        total: 'int'=None
     ) -> ("GET", r"/read"):
         """
         Действие для получения списка объектов.
@@ -47,8 +49,26 @@ class DictController(Controller, metaclass=Injectable):
         :param filter: Фильтр
         :param group: Группировка
         :param sort: Сортировка
+        :param cursor: Курсор keyset-пагинации, полученный с предыдущей
+        страницей (пустая строка - первая страница). Если указан, start
+        не используется, а результат имеет вид {"records", "cursor"}
+        :param total: Вернуть также общее кол-во записей (без учёта
+        start/limit), результат имеет вид {"records", "total"}
         :return: Итератор объектов
         """
+        if cursor is not None:
+            return self._read_seek(limit, filter, sort, cursor)
+
+        if total:
+            records, count = self.service().filters(
+                filter or []
+            ).sorts(
+                sort or []
+            ).limiter(
+                start, limit
+            ).read_page()
+            return {'records': records, 'total': count}
+
         return self.service().filters(
             filter or []
         ).sorts(
@@ -77,8 +97,7 @@ class DictController(Controller, metaclass=Injectable):
         :param records: Список объектов для изменения
         :return: Список измененных объектов
         """
-        return [self._update(record.pop('id'), record)
-                for record in records]
+        return self.service.bulk_update(records)
 
     def update(
         self,
@@ -96,16 +115,24 @@ class DictController(Controller, metaclass=Injectable):
 
     def bulk_destroy(
         self,
-        identifiers: "list"
+        identifiers: "list",
+        partial: "int"=None
     ) -> ("POST", r"/destroy/"):
         """
         Действие для удаления списка объектов.
 
         :param identifiers: Список идентификаторов
+        :param partial: Удалить объекты, на которые нет ссылок, результат
+        при этом имеет вид {"deleted", "failed"}
         :return: Список удаленных идентификаторов
         """
-        for id_ in identifiers:
-            self._destroy(id_)
+        failed = self.service.bulk_delete(identifiers, partial=bool(partial))
+        if partial:
+            skip = set(failed)
+            return {
+                'deleted': [i for i in identifiers if i not in skip],
+                'failed': failed
+            }
         return identifiers
 
     def destroy(self, id):
@@ -140,10 +167,22 @@ class DictController(Controller, metaclass=Injectable):
         :param records: Список данных об объектах
         :return: Список созданных объектов
         """
-        return (self._create(data) for data in records)
+        return self.service.bulk_create(records)
 
     # --- internals ---
 
+    def _read_seek(self, limit, filter, sort, cursor):
+        records, next_cursor = self.service().filters(
+            filter or []
+        ).seek(
+            sort or [], cursor
+        ).limiter(
+            None, limit
+        ).read_seek()
+        if limit is None or len(records) < limit:
+            next_cursor = None  # последняя страница
+        return {'records': records, 'cursor': next_cursor}
+
     def _update(self, id_, record):
         return self.service.filter_by_id(id_).update(**record)
 
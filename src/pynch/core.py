@@ -10,7 +10,6 @@ from yadic.container import Container as _Container
 from yadic.util import deep_merge as _deep_merge
 from pynch.util import load_configs as _load_configs
 from pynch import validators as _validators
-from pynch import exceptions as exc
 
 
 CATCH_ALL_PARAMS = object()
@@ -40,6 +39,32 @@ class _Wrappable:
         return self.fn(*args, **kwargs)
 
 
+def _initialize(nxt, *args, **kwargs):
+    """initialize.
+
+    Middleware, создающая для "потомков" пустой контекст
+    (если он ещё не создан)
+    """
+    kwargs.setdefault('_context', {})
+    return nxt(*args, **kwargs)
+
+
+def _finalize(nxt, controller, action, *args, **kwargs):
+    """finalize.
+
+    Middleware, убирающая контекст из параметров перед вызовом
+    конечного экшна. Если вызываемый экшн - не конечный,
+    то текущий экшн добавляется в список, хранящий
+    маршрут роутинга
+    """
+    if 'subroute' not in kwargs:
+        kwargs.pop('_context', None)
+    else:
+        kwargs['_context'].setdefault('path', []).append(
+            (controller, action))
+    return nxt(controller, action, *args, **kwargs)
+
+
 class ModuleContainer(_Container):
     """Реализация контейнера для использования на уровне модулей."""
 
@@ -52,26 +77,64 @@ class ModuleContainer(_Container):
         :param parent:
         """
         self._parent = parent
+        # кэши разбора имён и контейнеров, найденных по путям
+        self._names = {}
+        self._targets = {}
+        self._stable = None
         super().__init__(config)
 
     def get(self, group, name):
         """См. базовую документацию."""
-        if (group, name) == ('__internal__', '__this__'):
-            return self
-        path, real_name = self._PATH_RE.match(name).groups()
-        if path is None:
-            ctr = super()
-        else:
-            ctr = self
-            for step in path.split('/'):
-                if step == '..':
-                    ctr = ctr._parent
-                elif step == '':
-                    raise ValueError('Unobtainable path: $r!' % path)
-                else:
-                    ctr = ctr.get('module', step)._container
+        if '/' not in name:
+            # простое имя - путь разбирать не нужно
+            if (group, name) == ('__internal__', '__this__'):
+                return self
+            return super().get(group, name)
+
+        try:
+            path, real_name = self._names[name]
+        except KeyError:
+            path, real_name = self._names[name] = self._PATH_RE.match(
+                name).groups()
+        try:
+            ctr = self._targets[path]
+        except KeyError:
+            ctr, stable = self._walk(path)
+            if stable:
+                self._targets[path] = ctr
         return ctr.get(group, real_name)
 
+    def _walk(self, path):
+        """
+        Возвращает контейнер, находящийся по указанному пути.
+
+        А также признак того, что при обходе встречались только
+        модули-singleton и результат можно кэшировать
+        """
+        ctr, stable = self, True
+        for step in path.split('/'):
+            if step == '..':
+                ctr = ctr._parent
+            elif step == '':
+                raise ValueError('Unobtainable path: %r!' % path)
+            else:
+                stable = stable and step in ctr._stable_modules()
+                ctr = ctr.get('module', step)._container
+        return ctr, stable
+
+    def _stable_modules(self):
+        """Возвращает имена модулей со scope "singleton"/"static"."""
+        if self._stable is None:
+            try:
+                modules = self.itergroup('module')
+            except KeyError:
+                modules = ()
+            self._stable = frozenset(
+                name for name, blueprint, _ in modules
+                if blueprint.get('__type__') in ('singleton', 'static')
+            )
+        return self._stable
+
 
 class API:
     """
@@ -83,48 +146,76 @@ class API:
 
     CONTROLLER_GROUP = 'controller'
 
-    def __init__(self, *, container, middleware):
+    def __init__(self, *, container, middleware, compiled=False,
+                 per_controller=False, dispatch_cache=False):
         """Инициализирует API.
 
         :param container: DI-контейнер
         :type container: object
         :param middleware: iterable, задающее посл-ть middleware
         :type middleware: list
-        :param controller_group: ключ-наименование группы контроллеров
-        :type controller_group: str
+        :param compiled: собирать цепочку middleware однократно,
+            без промежуточных обёрток _Wrappable и _initialize
+        :type compiled: bool
+        :param per_controller: собирать отдельные цепочки для каждого
+            контроллера: middleware, в white_list которой контроллер
+            указан, заменяется на её bypass (или исключается, если
+            bypass не задан); подразумевает compiled
+        :type per_controller: bool
+        :param dispatch_cache: заранее разрешать экшны контроллеров
+            со scope "singleton"/"static" в таблицу диспетчеризации
+        :type dispatch_cache: bool
         """
-        def initialize(nxt, *args, **kwargs):
-            """initialize.
-
-            Middleware, создающая для "потомков" пустой контекст
-            (если он ещё не создан)
-            """
-            kwargs.setdefault('_context', {})
-            return nxt(*args, **kwargs)
-
-        def finalize(nxt, controller, action, *args, **kwargs):
-            """finalize.
-
-            Middleware, убирающая контекст из параметров перед вызовом
-            конечного экшна. Если вызываемый экшн - не конечный,
-            то текущий экшн добавляется в список, хранящий
-            маршрут роутинга
-            """
-            if 'subroute' not in kwargs:
-                kwargs.pop('_context', None)
-            else:
-                kwargs['_context'].setdefault('path', []).append(
-                    (controller, action))
-            return nxt(controller, action, *args, **kwargs)
+        self._container = container
 
-        # оборачиывание метода, вызывающего экшны, в middleware
-        call = self.call = _Wrappable(self.call)
-        call.wrap_with(finalize)
-        for mw in middleware[::-1]:
-            call.wrap_with(mw)
-        call.wrap_with(initialize)
+        # (controller, action) -> экшн, связанный с экземпляром контроллера
+        self._dispatch_table = {}
+        if dispatch_cache:
+            self.build_dispatch_table()
+
+        if compiled or per_controller:
+            self._middleware = tuple(middleware)
+            self._per_controller = per_controller
+            self._chains = {}
+            self._terminal = partial(_finalize, self.call)
+            if not per_controller:
+                self._chain_for(None)
+            self.call = self._dispatch
+        else:
+            # оборачиывание метода, вызывающего экшны, в middleware
+            call = self.call = _Wrappable(self.call)
+            call.wrap_with(_finalize)
+            for mw in middleware[::-1]:
+                call.wrap_with(mw)
+            call.wrap_with(_initialize)
+
+    def _chain_for(self, controller):
+        """
+        Возвращает скомпилированную цепочку middleware.
 
-        self._container = container
+        Для режима per_controller цепочка строится (однократно)
+        для каждого контроллера отдельно
+        """
+        key = controller if self._per_controller else None
+        try:
+            return self._chains[key]
+        except KeyError:
+            chain = self._terminal
+            for mw in reversed(self._middleware):
+                if key is not None and key in getattr(mw, 'white_list', ()):
+                    # bypass обязан вести себя так же, как сама MW
+                    # для white-listed контроллера
+                    mw = getattr(mw, 'bypass', None)
+                    if mw is None:
+                        continue
+                chain = partial(mw, chain)
+            self._chains[key] = chain
+            return chain
+
+    def _dispatch(self, controller, action, **kwargs):
+        """Вызывает экшн через скомпилированную цепочку middleware."""
+        kwargs.setdefault('_context', {})
+        return self._chain_for(controller)(controller, action, **kwargs)
 
     def call(self, controller, action, **kwargs):
         """
@@ -132,14 +223,51 @@ class API:
 
         Функция ищется по паре "контроллер" + "экшн"
         """
+        fn = self._dispatch_table.get((controller, action))
+        if fn is None:
+            fn = self._resolve(controller, action)
+        return fn(**kwargs)
+
+    def _resolve(self, controller, action):
+        """Возвращает экшн, получая контроллер из контейнера."""
         ctl = self._container.get(self.CONTROLLER_GROUP, controller)
         try:
-            action = getattr(ctl, action)
+            return getattr(ctl, action)
         except AttributeError:
             raise ValueError(
                 "The \"%s\" controller don't have an action \"%s\"!"
                 % (controller, action))
-        return action(**kwargs)
+
+    def build_dispatch_table(self):
+        """
+        Заполняет таблицу диспетчеризации.
+
+        В таблицу попадают только экшны контроллеров, чей экземпляр
+        не меняется между вызовами (scope "singleton" или "static"),
+        остальные контроллеры получаются из контейнера при каждом вызове
+        """
+        cached = {
+            name for name, blueprint, _ in self._container.itergroup(
+                self.CONTROLLER_GROUP)
+            if blueprint.get('__type__') in ('singleton', 'static')
+        }
+        for controller, action in self:
+            if controller in cached:
+                self._dispatch_table[(controller, action)] = self._resolve(
+                    controller, action)
+
+    def invalidate(self, controller=None):
+        """
+        Удаляет экшны контроллера из таблицы диспетчеризации.
+
+        Используется при пересоздании экземпляра контроллера.
+        Если контроллер не указан, таблица очищается полностью
+        """
+        if controller is None:
+            self._dispatch_table.clear()
+        else:
+            for key in [k for k in self._dispatch_table if k[0] == controller]:
+                del self._dispatch_table[key]
 
     def __iter__(self):
         """Возвращает итератор пар вида (controller, action)."""
@@ -194,7 +322,8 @@ class Frontend:
                         action
                     )
                     self._action_specs[(controller, action)] = (
-                        mspec.get('parameters', []),
+                        _validators.ValidationPlan(
+                            mspec.get('parameters', [])),
                         mspec.get('responses', []),
                     )
 
@@ -213,33 +342,9 @@ class Frontend:
         controller, action, path_params = self._router.route(method, path)
         # описание обязано быть, ибо по нему строился роутинг,
         # поэтому не ловится KeyError
-        (param_spec, resp_spec) = self._action_specs[(controller, action)]
-        out_params = {}
+        (validate, resp_spec) = self._action_specs[(controller, action)]
         query_params = params.copy()
-        for param in param_spec:
-            try:
-                validator = _validators.VALIDATORS[param['type']]
-                validator = validator.get(
-                    param.get('format'), validator['default'])
-
-                validate = validator(**param)
-            except KeyError:
-                raise exc.ValidationError(
-                    'Unknown parameter type: %r' % param.get('type')
-                )
-            else:
-                # TODO: дореализовать обработку параметров
-                # в теле запроса и проч
-                assert param['in'] in {'path', 'query'}
-                # валидатор перемещает параметр из одного из
-                # входных словарей в выходной словарь параметров
-                validate(
-                    in_dict=(
-                        path_params if param['in'] == 'path'
-                        else query_params
-                    ),
-                    out_dict=out_params
-                )
+        out_params = validate(path_params, query_params)
         # сохранение контекста
         if '_context' in query_params:
             out_params['_context'] = query_params.pop('_context')
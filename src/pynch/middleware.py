@@ -4,6 +4,8 @@
 from datetime import datetime
 from sys import stderr
 
+from pynch.util import Stream
+
 
 def _timestamped(s):
     """'asd' -> 2014/12/12|08:30:45|asd."""
@@ -30,10 +32,27 @@ def log_errors_to_stderr(nxt, controller, action, **params):
 
 
 def transact(session):
-    """Транзакционная mw, оборачивает запрос в транзакцию."""
+    """Транзакционная mw, оборачивает запрос в транзакцию.
+
+    Для результатов потокового чтения (Stream) транзакция завершается
+    только после их полного получения, т.к. они читают данные
+    из открытого курсора
+    """
+    def _iterate(result):
+        committed = False
+        try:
+            yield from result
+            session.commit()
+            committed = True
+        finally:
+            if not committed:
+                session.rollback()
+
     def _transact(f, *args, **kwargs):
         try:
             result = f(*args, **kwargs)
+            if isinstance(result, Stream):
+                return Stream(_iterate(result))
             session.commit()
         except Exception:
             session.rollback()
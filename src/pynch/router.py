@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 """Набор конструкций для роутинга на контроллеры и действия."""
 
+from functools import lru_cache
+from heapq import merge
+from itertools import count
 import re
 
 import routes
 
 
-__all__ = ('Router', 'RoutingError')
+__all__ = ('Router', 'RoutesRouter', 'CachingRouter', 'RoutingError')
 
 
 class RoutingError(Exception):
@@ -16,18 +19,131 @@ class RoutingError(Exception):
     pass
 
 
+class _Node:
+
+    """Узел дерева сегментов пути."""
+
+    __slots__ = ('children', 'routes')
+
+    def __init__(self):
+        """."""
+        # сегмент пути -> дочерний узел
+        self.children = {}
+        # метод -> список (порядковый номер, regex, контроллер, экшн)
+        self.routes = {}
+
+    def add(self, methods, entry):
+        """Добавляет маршрут для указанных методов."""
+        for method in methods:
+            self.routes.setdefault(method, []).append(entry)
+
+    def match(self, method, path):
+        """Возвращает контроллер, экшн и параметры или None."""
+        own = self.routes.get(method, ())
+        any_ = self.routes.get(Router.ANY_METHOD, ())
+        # маршруты проверяются в порядке регистрации
+        candidates = merge(own, any_) if own and any_ else own or any_
+        for _, regex, controller, action in candidates:
+            if regex is None:
+                return controller, action, {}
+            match = regex.fullmatch(path)
+            if match:
+                return controller, action, match.groupdict()
+
+
 class Router:
 
-    """ Механизм маршрутизации по API-KEY (URL, id, etc.)."""
+    """ Механизм маршрутизации по API-KEY (URL, id, etc.).
+
+    Маршруты без переменных ищутся по точному совпадению пути,
+    остальные - в дереве сегментов их статического префикса.
+    Регулярные выражения проверяются только для маршрутов на совпавшей
+    ветви дерева, начиная с наиболее длинного префикса.
+    """
 
     PATH_VAR_RE = re.compile(r'\{(.*?)\}')
 
+    ANY_METHOD = '*'
+
     def __init__(self):
-        """Инициализирует роутер.
+        """Инициализирует роутер."""
+        self._static = {}
+        self._root = _Node()
+        self._counter = count()
+
+    def register(self, method, route, controller, action):
+        """Регистрирует экшн и возвращает path для его вызова
 
-        :param controllers: итератор контроллеров в виде контежей (name, class)
-        :type controllers: object
+        :param method: 'GET'/'POST',...
+        :type method: str
+        :param route: route
+        :type route: str
+        :param controller: Контроллер
+        :type controller: str
+        :param action: Экшн
+        :type action: str
         """
+        methods = (method,) if isinstance(method, str) else tuple(method)
+        if self.ANY_METHOD in methods:
+            methods = (self.ANY_METHOD,)
+
+        var = self.PATH_VAR_RE.search(route)
+        if var is None:
+            node, regex = self._static.setdefault(route, _Node()), None
+        else:
+            node, regex = self._root, self._compile(route)
+            # узлы создаются только для сегментов, целиком
+            # входящих в статический префикс маршрута
+            for segment in route[:var.start()].split('/')[1:-1]:
+                node = node.children.setdefault(segment, _Node())
+        node.add(methods, (next(self._counter), regex, controller, action))
+
+    def _compile(self, route):
+        """Возвращает regex для маршрута с переменными."""
+        pattern, pos = [], 0
+        for var in self.PATH_VAR_RE.finditer(route):
+            name, _, regex = var.group(1).partition(':')
+            pattern.append(re.escape(route[pos:var.start()]))
+            pattern.append('(?P<%s>%s)' % (name, regex or '.*'))
+            pos = var.end()
+        pattern.append(re.escape(route[pos:]))
+        return re.compile(''.join(pattern))
+
+    def route(self, method, path):
+        """Возвращает контроллер, экшн и параметры по url(path).
+
+        :param method: 'GET" или ('GET', 'POST'...)
+        :type key: object
+        :param path: routing path
+        :type path: str
+        """
+        node = self._static.get(path)
+        dest = node and node.match(method, path)
+        if not dest:
+            nodes = [self._root]
+            for segment in path.split('/')[1:-1]:
+                node = nodes[-1].children.get(segment)
+                if node is None:
+                    break
+                nodes.append(node)
+            # более длинный префикс имеет приоритет
+            for node in reversed(nodes):
+                dest = node.match(method, path)
+                if dest:
+                    break
+            else:
+                raise RoutingError('Wrong path: "%s"!' % path)
+        return dest
+
+
+class RoutesRouter:
+
+    """ Механизм маршрутизации на основе routes.Mapper."""
+
+    PATH_VAR_RE = Router.PATH_VAR_RE
+
+    def __init__(self):
+        """Инициализирует роутер."""
         self._mapper = routes.Mapper()
 
     def register(self, method, route, controller, action):
@@ -64,3 +180,40 @@ class Router:
 
         controller_name, action_name = map(dest.pop, ('controller', 'action'))
         return controller_name, action_name, dest
+
+
+class CachingRouter:
+
+    """ Роутер с LRU-кэшем результатов маршрутизации.
+
+    Оборачивает любой роутер с методами register/route.
+    Ошибки маршрутизации не кэшируются.
+    """
+
+    def __init__(self, router=None, size=1024):
+        """Инициализирует роутер.
+
+        :param router: оборачиваемый роутер (по умолчанию - Router)
+        :type router: object
+        :param size: максимальное кол-во кэшируемых пар (method, path)
+        :type size: int
+        """
+        self._router = router or Router()
+        self._route = lru_cache(maxsize=size)(self._router.route)
+
+    def register(self, method, route, controller, action):
+        """См. Router.register."""
+        self._router.register(method, route, controller, action)
+        self._route.cache_clear()
+
+    def route(self, method, path):
+        """См. Router.route.
+
+        Параметры возвращаются копией, т.к. вызывающий код их изменяет
+        """
+        controller, action, params = self._route(method, path)
+        return controller, action, dict(params)
+
+    def cache_info(self):
+        """Возвращает статистику кэша (hits, misses, maxsize, currsize)."""
+        return self._route.cache_info()
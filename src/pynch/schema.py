@@ -1,14 +1,20 @@
 # coding: utf-8
 """Набор конструкция для работы с уровнем моделей."""
+import copy
+from itertools import groupby
 import os
 
 import simplejson as json
 import sqlalchemy
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext import baked
 from sqlalchemy.ext.automap import automap_base
 from sqlalchemy.inspection import inspect
 from sqlalchemy.orm.properties import ColumnProperty
-from sqlalchemy.sql.schema import Table, MetaData, Column, Index
+from sqlalchemy.sql.expression import and_, bindparam, text
+from sqlalchemy.sql.schema import (
+    Table, MetaData, Column, Index, PrimaryKeyConstraint, UniqueConstraint)
 
 import pynch.exceptions as exc
 
@@ -74,6 +80,18 @@ class Model:
     # Аналогично select *
     ASTERISK = "*"
 
+    # СУБД, поддерживающие многострочный INSERT ... RETURNING
+    RETURNING_DIALECTS = ('postgresql',)
+
+    # СУБД, в которых список объектов создается одним executemany
+    EXECUTEMANY_DIALECTS = ('sqlite',)
+
+    # Имя параметра с идентификатором объекта в пакетных операциях
+    ID_PARAM = '_id'
+
+    # Кэш построенных запросов и их компиляции для каждого диалекта
+    bakery = baked.bakery(size=500)
+
     # Возможные операции соединения
     JOIN_CONDITIONS = {
         '==': 'join',
@@ -95,8 +113,13 @@ class Model:
         self._session = session
         self._labels = {}
 
-        qs = self._create_select(session, select,
-                                 [outher[0] for *_, outher in joins or []])
+        # Экземпляры модели с одинаковой конфигурацией
+        # строят одинаковые запросы (ключ кэша шаблонов запросов)
+        self.cache_key = (db_mapper, session, name, repr(joins), repr(select))
+
+        self._joined = [outher[0] for *_, outher in joins or []]
+
+        qs = self._create_select(session, select, self._joined)
 
         self._qs = self._create_joins(qs, joins or [])
 
@@ -153,6 +176,51 @@ class Model:
         """Работа с запросами."""
         return self._qs
 
+    @property
+    def tables(self):
+        """Имена таблиц модели (текущей и соединяемых)."""
+        return [
+            getattr(self._db_mapper, name).__table__.name
+            for name in [self._name] + self._joined
+        ]
+
+    @property
+    def fields(self):
+        """Наименования полей (алиасов), выбираемых запросами модели."""
+        return list(self._labels)
+
+    def project(self, fields):
+        """
+        Возвращает модель, запросы которой выбирают только указанные поля.
+
+        :param fields: Список наименований полей (алиасов) модели
+        """
+        model = copy.copy(self)
+        model._labels = {field: self._labels[field] for field in fields}
+        model._qs = self._qs.with_entities(*model._labels.values())
+        model.cache_key = self.cache_key + (tuple(fields),)
+        return model
+
+    def bake(self, key, build):
+        """
+        Возвращает baked-запрос на основе базового запроса модели.
+
+        Запрос строится один раз для ключа и конфигурации модели,
+        а компилируется один раз для каждого диалекта (engine).
+        Ключ начинается с пространства имен места вызова (например,
+        "service.query"), за которым следуют все значения, влияющие
+        на структуру запроса, строящегося функцией build
+        :param key: Кортеж (пространство имен, *значения)
+        :param build: Функция, дополняющая базовый запрос критериями
+        """
+        if not (isinstance(key, tuple) and key and isinstance(key[0], str)):
+            raise TypeError(
+                'Baked query key must be a tuple (namespace, *values)!')
+        qs = self._qs
+        return self.bakery(
+            lambda session: build(qs.with_session(session)),
+            self.cache_key, key)
+
     def create_object(self, **kwargs):
         """Операция создания объекта."""
         obj = self.current()
@@ -173,6 +241,225 @@ class Model:
             )
         return obj
 
+    def create_objects(self, records, chunk_size):
+        """
+        Операция создания списка объектов без создания ORM-объектов.
+
+        Объекты с одинаковым набором полей создаются одним запросом на
+        chunk_size объектов: на PostgreSQL - многострочным INSERT ...
+        RETURNING, на SQLite - INSERT с набором параметров (executemany)
+        с последующим получением созданных объектов одним запросом.
+        В остальных СУБД (и при явно указанных id) объекты создаются
+        через ORM по одному
+        :param records: Список словарей значений полей
+        :param chunk_size: Максимальное кол-во объектов в одном запросе
+        :return: Список словарей значений полей созданных объектов
+        """
+        table = self.current.__table__
+        for values in records:
+            for item in values:
+                if item not in table.c:
+                    raise exc.NameValidationError(item, self.current)
+
+        dialect = self._session.bind.dialect.name
+        if dialect in self.RETURNING_DIALECTS:
+            insert = self._insert_returning
+        elif (dialect in self.EXECUTEMANY_DIALECTS and
+                not any('id' in values for values in records)):
+            insert = self._insert_many
+        else:
+            return [
+                {
+                    column.name: getattr(obj, column.name)
+                    for column in table.columns
+                }
+                for obj in (
+                    self.create_object(**values) for values in records)
+            ]
+
+        try:
+            return self._insert_groups(table, records, chunk_size, insert)
+        except IntegrityError as e:
+            raise exc.ValidationError(
+                str(e.orig)
+            )
+
+    def _insert_groups(self, table, records, chunk_size, insert):
+        # Создание подряд идущих объектов с одинаковым набором полей
+        # порциями по chunk_size объектов функцией insert(table, records),
+        # возвращающей строки созданных объектов в порядке records.
+        # Идентификаторы назначаются в порядке следования объектов
+        result = []
+        for columns, group in groupby(records, frozenset):
+            group = list(group)
+            for i in range(0, len(group), chunk_size):
+                chunk = group[i:i + chunk_size]
+                if columns:
+                    rows = insert(table, chunk)
+                else:
+                    # для пустых наборов многострочный INSERT невозможен
+                    rows = [self._insert_default(table) for _ in chunk]
+                result.extend(map(dict, rows))
+        return result
+
+    def _insert_returning(self, table, records):
+        # Многострочный INSERT ... RETURNING
+        return self._session.execute(
+            table.insert().values(records).returning(*table.c)
+        ).fetchall()
+
+    def _insert_many(self, table, records):
+        # INSERT с набором параметров. Транзакция блокирует запись в БД,
+        # поэтому созданные объекты - последние по идентификатору
+        self._session.execute(table.insert(), records)
+        rows = self._session.execute(
+            table.select().order_by(
+                table.c.id.desc()
+            ).limit(len(records))
+        ).fetchall()
+        return rows[::-1]
+
+    def _insert_default(self, table):
+        # Создание объекта со значениями полей по умолчанию
+        id_ = self._session.execute(table.insert()).inserted_primary_key[0]
+        return self._session.execute(
+            table.select().where(table.c.id == id_)).first()
+
+    def upsert_object(self, keys, **kwargs):
+        """
+        Операция создания объекта с заменой существующего одним запросом.
+
+        Заменяется объект с теми же значениями полей keys запросом
+        INSERT ... ON CONFLICT (keys) DO UPDATE (PostgreSQL, SQLite 3.24+),
+        конфликт по другим уникальным ограничениям приводит к ошибке.
+
+        Если СУБД не поддерживает upsert или по полям keys нет
+        уникального ограничения (ON CONFLICT его требует), объекты
+        с теми же значениями keys удаляются запросом DELETE перед INSERT.
+        Такая замена не атомарна: срабатывают каскадные удаления и
+        триггеры на удаление, а параллельные вызовы с одинаковыми keys
+        могут создать несколько объектов (без ограничения их ничто
+        не запрещает). Для атомарной замены по keys нужно уникальное
+        ограничение
+        :param keys: Список полей (желательно - уникального ограничения)
+        :param kwargs: Значения полей объекта
+        """
+        table = self.current.__table__
+        for item in kwargs:
+            if item not in table.c:
+                raise exc.NameValidationError(item, self.current)
+
+        dialect = self._session.bind.dialect
+        if dialect.name == 'sqlite' and (
+                dialect.dbapi.sqlite_version_info >= (3, 24)):
+            dialect = 'sqlite'
+        else:
+            dialect = dialect.name
+        if not self._is_unique(table, keys):
+            dialect = None
+        try:
+            if dialect == 'postgresql':
+                stmt = postgresql.insert(table).values(**kwargs)
+                update = {
+                    item: stmt.excluded[item]
+                    for item in kwargs if item not in keys
+                }
+                if update:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=keys, set_=update)
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+            elif dialect == 'sqlite':
+                stmt = self._sqlite_upsert(table, keys, kwargs)
+            else:
+                self._session.execute(table.delete().where(and_(
+                    *(table.c[item] == kwargs[item] for item in keys))))
+                stmt = table.insert().values(**kwargs)
+            self._session.execute(stmt)
+        except IntegrityError as e:
+            raise exc.ValidationError(
+                str(e.orig)
+            )
+
+    def _sqlite_upsert(self, table, keys, values):
+        # INSERT ... ON CONFLICT (keys) DO UPDATE для SQLite
+        # (в sqlalchemy 1.3 нет конструкции для этого диалекта)
+        quote = self._session.bind.dialect.identifier_preparer.quote
+        names = list(values)
+        params = [
+            bindparam('p{0}'.format(i), values[name], type_=table.c[name].type)
+            for i, name in enumerate(names)
+        ]
+        update = ', '.join(
+            '{0} = excluded.{0}'.format(quote(table.c[name].name))
+            for name in names if name not in keys)
+        return text(
+            'INSERT INTO {table} ({columns}) VALUES ({params}) '
+            'ON CONFLICT ({keys}) DO {action}'.format(
+                table=quote(table.name),
+                columns=', '.join(quote(table.c[name].name) for name in names),
+                params=', '.join(':' + param.key for param in params),
+                keys=', '.join(quote(table.c[key].name) for key in keys),
+                action='UPDATE SET ' + update if update else 'NOTHING')
+        ).bindparams(*params)
+
+    @staticmethod
+    def _is_unique(table, keys):
+        # Есть ли у таблицы уникальное ограничение (индекс) ровно по keys
+        unique = [
+            set(constraint.columns.keys())
+            for constraint in table.constraints
+            if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint))
+        ] + [set(index.columns.keys()) for index in table.indexes
+             if index.unique]
+        return set(keys) in unique
+
+    def update_objects(self, changes):
+        """
+        Операция изменения списка объектов.
+
+        Объекты группируются по набору изменяемых полей, каждая группа
+        изменяется одним UPDATE с набором параметров (executemany)
+        :param changes: итератор пар (id объекта, словарь значений полей)
+        """
+        table = self.current.__table__
+        groups = {}
+        for id_, values in changes:
+            for item in values:
+                if item not in table.c:
+                    raise exc.NameValidationError(item, self.current)
+            groups.setdefault(frozenset(values), []).append(
+                dict(values, **{self.ID_PARAM: id_}))
+
+        for params in groups.values():
+            # изменяемые поля определяются по ключам параметров
+            self._session.execute(
+                table.update().where(
+                    table.c.id == bindparam(self.ID_PARAM)),
+                params
+            )
+
+    def delete_objects(self, ids):
+        """
+        Операция удаления списка объектов одним запросом.
+
+        :param ids: Список идентификаторов
+        :return: Кол-во удаленных объектов
+        """
+        table = self.current.__table__
+        return self._session.execute(
+            table.delete().where(table.c.id.in_(ids))
+        ).rowcount
+
+    def savepoint(self):
+        """
+        Возвращает точку сохранения транзакции.
+
+        Используется как контекстный менеджер: при исключении изменения
+        откатываются до точки сохранения
+        """
+        return self._session.begin_nested()
+
     def get_field(self, field_name):
         """
         Получение объекта поля по его наименованию.
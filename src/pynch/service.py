@@ -2,16 +2,110 @@
 """Конструкции для реализация уровня сервисов."""
 
 import operator
-from datetime import date
-
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+import threading
+
+from dateutil.parser import parse as parse_date
+from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext import baked
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.sql import expression, operators
+from sqlalchemy.sql import bindparam, expression, func, operators
 
 from pynch.adapter import DefaultAdapter
+from pynch.util import Stream, get_json_codec
 import pynch.exceptions as exc
 
 
+# Максимальное кол-во идентификаторов в одном условии IN (...)
+BULK_CHUNK_SIZE = 500
+
+# Кол-во строк результата запроса, преобразуемых одной порцией
+BATCH_SIZE = 1000
+
+# Метка колонок, значения которых составляют курсор keyset-пагинации
+_KEY_LABEL = '__key_{0}'
+
+# Метка колонки с общим кол-вом записей (без учёта limit/offset)
+_TOTAL_LABEL = '__total'
+
+# Имя параметра шаблона запроса
+_PARAM_LABEL = '__param_{0}'
+
+# Максимальное кол-во шаблонов запросов в кэше
+QUERY_CACHE_SIZE = 256
+
+# Операции сервиса, запросы которых строятся по шаблонам.
+# Операции изменения и удаления вычисляют условия запроса
+# для объектов сессии, поэтому им нужны значения, а не параметры
+_TEMPLATE_OPERATIONS = frozenset(('_get', '_read', '_read_page'))
+
+# Операции, выполняющие запрос без изменений: запрос кэшируется
+# вместе с результатом компиляции (baked-запрос)
+_BAKED_OPERATIONS = frozenset(('_get', '_read'))
+
+# Методы построителя запросов, которые заменяются шаблоном запроса.
+# Если наследник переопределяет любой из них, шаблоны не используются
+_TEMPLATE_METHODS = (
+    'build', '_create_qs', 'apply_filter', 'apply_sorter',
+    '_filter', '_filters', '_filter_by_id', '_sort', '_sorts', '_limit'
+)
+
+# Функции, вызываемые после изменения данных таблицы сервисом
+_write_listeners = []
+
+# Ключ Session.info с именами таблиц, измененных в текущей транзакции
+_WRITTEN_TABLES = 'pynch.written_tables'
+
+# Ключ Session.info с функциями, вызываемыми после фиксации транзакции
+_AFTER_COMMIT = 'pynch.after_commit'
+
+# Восстановление значений курсора, не представимых в json
+_CURSOR_TYPES = {
+    '$datetime': parse_date,
+    '$date': lambda value: parse_date(value).date(),
+    '$decimal': Decimal,
+}
+
+
+def on_write(listener):
+    """
+    Регистрирует функцию, вызываемую после изменения данных сервисом.
+
+    Функция вызывается с именем таблицы после фиксации транзакции,
+    в которой выполнялись операции создания, изменения и удаления
+    (в т.ч. пакетные). При откате транзакции функция не вызывается
+    :param listener: Функция от имени таблицы
+    :return: listener
+    """
+    _write_listeners.append(listener)
+    return listener
+
+
+def _committed(session):
+    # Оповещение об изменении таблиц зафиксированной транзакцией.
+    # after_commit вызывается и при освобождении точки сохранения -
+    # оповещения ждут фиксации транзакции верхнего уровня
+    if session.transaction.nested:
+        return
+    for table in session.info.pop(_WRITTEN_TABLES, ()):
+        for listener in _write_listeners:
+            listener(table)
+    for callback in session.info.pop(_AFTER_COMMIT, ()):
+        callback()
+
+
+def _transaction_end(session, transaction):
+    # Откат транзакции верхнего уровня - изменений нет
+    if transaction.parent is None:
+        session.info.pop(_WRITTEN_TABLES, None)
+        session.info.pop(_AFTER_COMMIT, None)
+
+
 def _mapping_property(f):
     """Декоратор, возвращающий объект sqlalchemy по составному имени поля. """
     def wrapper(self, property, *args, **kwargs):
@@ -20,33 +114,39 @@ def _mapping_property(f):
     return wrapper
 
 
-def _filter(column, operator_text, value):
-    values = {
-        'like': {
-            'type': operators.ilike_op,
-            'format': '%{0}%'
-        },
-        'eq': operator.eq,
-        'lt': operator.lt,
-        'le': operator.le,
-        'gt': operator.gt,
-        'ge': operator.ge,
-        'in': operators.in_op
-    }
+_FILTERS = {
+    'like': {
+        'type': operators.ilike_op,
+        'format': '%{0}%'
+    },
+    'eq': operator.eq,
+    'lt': operator.lt,
+    'le': operator.le,
+    'gt': operator.gt,
+    'ge': operator.ge,
+    'in': operators.in_op
+}
+
 
-    if operator_text not in values.keys():
+def _filter_operator(operator_text):
+    # Функция оператора и формат значения для него (или None)
+    if operator_text not in _FILTERS.keys():
         raise exc.ValidationError(
             'Operator "{0}" not supported. Available operators: [{1}]'.format(
                 operator_text,
-                ', '.join(values.keys())
+                ', '.join(_FILTERS.keys())
             ))
 
-    oper = values[operator_text]
+    oper = _FILTERS[operator_text]
     if isinstance(oper, dict):
-        func = oper['type']
-        value = oper['format'].format(value)
-    else:
-        func = oper
+        return oper['type'], oper['format']
+    return oper, None
+
+
+def _filter(column, operator_text, value):
+    func, format_ = _filter_operator(operator_text)
+    if format_:
+        value = format_.format(value)
 
     return func(column, value)
 
@@ -66,6 +166,63 @@ def _sorter(direction):
     return values[direction]
 
 
+def _encode_cursor(values):
+    # Преобразование значений ключа последней записи в непрозрачный курсор
+    data = []
+    for value in values:
+        if isinstance(value, datetime):
+            value = {'$datetime': value.isoformat()}
+        elif isinstance(value, date):
+            value = {'$date': value.isoformat()}
+        elif isinstance(value, Decimal):
+            value = {'$decimal': str(value)}
+        data.append(value)
+    return urlsafe_b64encode(get_json_codec().dumps(data)).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    # Преобразование курсора в список значений ключа
+    try:
+        data = get_json_codec().loads(urlsafe_b64decode(cursor.encode()))
+        values = []
+        for value in data:
+            if isinstance(value, dict):
+                (tag, value), = value.items()
+                value = _CURSOR_TYPES[tag](value)
+            values.append(value)
+    except (KeyError, TypeError, ValueError):
+        raise exc.ValidationError('Wrong cursor: "{0}"'.format(cursor))
+    return values
+
+
+def _nullable(column):
+    # Признак того, что колонка сортировки может содержать NULL
+    return getattr(column, 'nullable', True)
+
+
+def _keyset_condition(columns, values):
+    # Условие "запись после ключа" для колонок с направлениями сортировки:
+    # (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...
+    # NULL в nullable-колонках считается больше любого значения
+    # (порядок задаётся в _QuerySetBuilder._seek)
+    clauses, equal = [], []
+    for (column, direction), value in zip(columns, values):
+        if value is None:
+            # после NULL по возрастанию - только другие NULL
+            after = column.isnot(None) if direction == 'DESC' else None
+            same = column.is_(None)
+        else:
+            compare = operator.gt if direction == 'ASC' else operator.lt
+            after = compare(column, value)
+            if direction == 'ASC' and _nullable(column):
+                after = expression.or_(after, column.is_(None))
+            same = column == value
+        if after is not None:
+            clauses.append(expression.and_(*(equal + [after])))
+        equal.append(same)
+    return expression.or_(*clauses)
+
+
 def _delegate_proxy(name):
     def wrap(self, *args, **kwargs):
         return self.create_proxy(
@@ -78,20 +235,161 @@ def _delegate_proxy(name):
 
 def _delegate_service(name):
     def wrap(self, *args, **kwargs):
-        return self._callback(name)(
-            self.query_builder(
-                self._model
-            ).build(
-                self.queue
-            ), *args, **kwargs)
+        builder = self.query_builder(self._model)
+        if type(builder).build is _QuerySetBuilder.build:
+            qs = builder.build(self.queue, operation=name)
+        else:
+            # переопределённый build мог не принимать operation
+            qs = builder.build(self.queue)
+        return self._callback(name)(qs, *args, **kwargs)
 
     return wrap
 
 
+class QueryCache:
+
+    """LRU-кэш шаблонов запросов со статистикой попаданий."""
+
+    def __init__(self, size=QUERY_CACHE_SIZE):
+        """.
+
+        :param size: Максимальное кол-во шаблонов
+        """
+        self.size = size
+        self.hits = self.misses = 0
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """
+        Возвращает шаблон по ключу.
+
+        Шаблон строится вне блокировки, при одновременном построении
+        в нескольких потоках сохраняется первый из построенных
+        :param key: Ключ шаблона
+        :param factory: Функция построения шаблона при его отсутствии
+        """
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self.hits += 1
+                self._templates.move_to_end(key)
+                return template
+            self.misses += 1
+
+        template = factory()
+        with self._lock:
+            template = self._templates.setdefault(key, template)
+            self._templates.move_to_end(key)
+            if len(self._templates) > self.size:
+                self._templates.popitem(last=False)
+        return template
+
+    @property
+    def hit_rate(self):
+        """Доля запросов, построенных по готовому шаблону."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def info(self):
+        """Возвращает статистику кэша."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'size': len(self._templates),
+            'maxsize': self.size,
+        }
+
+    def clear(self):
+        """Очищает кэш и статистику."""
+        with self._lock:
+            self._templates.clear()
+            self.hits = self.misses = 0
+
+
+query_cache = QueryCache()
+
+
+class _QueryShape:
+
+    """
+    Структура очереди операций кверисета.
+
+    Повторяет операции построителя, но вместо построения запроса
+    запоминает поля, операторы и направления (ключ шаблона),
+    а значения - как параметры шаблона
+    """
+
+    def __init__(self, model):
+        self._model = model
+        self.steps = []
+        self.params = {}
+
+    def _param(self, value):
+        name = _PARAM_LABEL.format(len(self.params))
+        self.params[name] = value
+        return name
+
+    def _filter(self, property, operator, *args, **kwargs):
+        if args or kwargs:
+            if kwargs:
+                value = kwargs['value']
+            if args:
+                value = args[0]
+
+            value = Serializer.to_record(
+                self._model.get_field(property), value)
+            _, format_ = _filter_operator(operator)
+            if format_:
+                value = format_.format(value)
+
+            self.steps.append((
+                '_filter', property, operator,
+                None if value is None else self._param(value)
+            ))
+
+    def _filters(self, filters):
+        for filter_ in filters:
+            self._filter(**filter_)
+
+    def _filter_by_id(self, id_):
+        self._filter('id', 'eq', id_)
+
+    def _sort(self, property, direction):
+        _sorter(direction)
+        self.steps.append(('_sort', property, direction))
+
+    def _sorts(self, sorts):
+        for sort in sorts:
+            self._sort(**sort)
+
+    def _limit(self, offset, limit):
+        self.steps.append((
+            '_limit',
+            offset is not None and self._param(offset),
+            limit is not None and self._param(limit)
+        ))
+
+
 class _QuerySetBuilder:
     apply_filter = staticmethod(_filter)
     apply_sorter = staticmethod(lambda x, y: _sorter(y)(x))
 
+    cache = query_cache
+
+    # Построение запросов по шаблонам; отключается для наследников,
+    # переопределяющих методы из _TEMPLATE_METHODS (если наследник
+    # не задал значение явно)
+    templated = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'templated' not in cls.__dict__:
+            cls.templated = all(
+                getattr(cls, name) is getattr(_QuerySetBuilder, name)
+                for name in _TEMPLATE_METHODS)
+
     def __init__(self, model):
         self._model = model
         self._qs = self._create_qs()
@@ -99,11 +397,64 @@ class _QuerySetBuilder:
     def _create_qs(self):
         return self._model.create_query()
 
-    def build(self, queue):
+    def build(self, queue, operation=None):
+        if self.templated and operation in _TEMPLATE_OPERATIONS:
+            qs = self._build_cached(
+                queue, bake=operation in _BAKED_OPERATIONS)
+            if qs is not None:
+                return qs
+
         for item, args, kwargs in queue:
             getattr(self, item)(*args, **kwargs)
         return self._qs
 
+    # TEMPLATES:
+    def _build_cached(self, queue, bake=False):
+        # Запрос по шаблону для очереди той же структуры: выражения
+        # строятся один раз, значения передаются параметрами.
+        # Для baked-шаблона результатом будет baked.Result, иначе - Query.
+        # None, если операции очереди не поддерживают шаблоны
+        shape = _QueryShape(self._model)
+        for item, args, kwargs in queue:
+            step = getattr(shape, item, None)
+            if step is None:
+                return None
+            step(*args, **kwargs)
+
+        steps = tuple(shape.steps)
+        if bake:
+            template = self.cache.get(
+                (self._model.cache_key, steps, bake),
+                lambda: self._model.bake(
+                    ('service.query', steps),
+                    lambda qs: self._build_template(qs, steps)))
+            return template(self._qs.session).params(shape.params)
+
+        template = self.cache.get(
+            (self._model.cache_key, steps, bake),
+            lambda: self._build_template(self._qs, steps))
+        return template.params(shape.params)
+
+    def _build_template(self, qs, steps):
+        for item, *args in steps:
+            if item == '_filter':
+                property, operator, param = args
+                func, _ = _filter_operator(operator)
+                value = param and bindparam(
+                    param, expanding=func is operators.in_op)
+                qs = qs.filter(func(self._model.get_field(property), value))
+            elif item == '_sort':
+                property, direction = args
+                qs = qs.order_by(self.apply_sorter(
+                    self._model.get_field(property), direction))
+            else:
+                offset, limit = args
+                if offset:
+                    qs = qs.offset(bindparam(offset))
+                if limit:
+                    qs = qs.limit(bindparam(limit))
+        return qs
+
     # FILTERS:
     @_mapping_property
     def _filter(self, property, operator, *args, **kwargs):
@@ -136,6 +487,38 @@ class _QuerySetBuilder:
         for sort in sorts:
             self._sort(**sort)
 
+    # KEYSET:
+    def _seek(self, sorts, cursor=None):
+        # Сортировка с добавлением первичного ключа,
+        # отбор записей после курсора и добавление колонок ключа в выборку
+        columns = []
+        for sort in sorts:
+            _sorter(sort['direction'])
+            columns.append(
+                (self._model.get_field(sort['property']), sort['direction']))
+        if 'id' not in (sort['property'] for sort in sorts):
+            columns.append((self._model.get_field('id'), 'ASC'))
+
+        for column, direction in columns:
+            if _nullable(column):
+                # NULL - после значений по возрастанию, перед ними по
+                # убыванию, независимо от порядка NULL в конкретной СУБД
+                self._qs = self._qs.order_by(
+                    self.apply_sorter(column.is_(None), direction))
+            self._qs = self._qs.order_by(self.apply_sorter(column, direction))
+
+        if cursor:
+            values = _decode_cursor(cursor)
+            if len(values) != len(columns):
+                raise exc.ValidationError(
+                    'Cursor doesn\'t match the sorting')
+            self._qs = self._qs.filter(_keyset_condition(columns, values))
+
+        self._qs = self._qs.add_columns(*(
+            column.label(_KEY_LABEL.format(i))
+            for i, (column, _) in enumerate(columns)
+        ))
+
     def _limit(self, offset, limit):
         if offset is not None:
             self._qs = self._qs.offset(offset)
@@ -164,28 +547,140 @@ class _Proxy:
 
     limiter = _delegate_proxy('_limit')
 
+    seek = _delegate_proxy('_seek')
+
     get = _delegate_service('_get')
     read = _delegate_service('_read')
+    read_seek = _delegate_service('_read_seek')
+    read_page = _delegate_service('_read_page')
     exists = _delegate_service('_exists')
 
     update = _delegate_service('_update')
     delete = _delegate_service('_delete')
 
 
+def _timestamp_to_date(value):
+    # Дата по timestamp (в секундах или милисекундах)
+    if value is None or isinstance(value, date):
+        return value
+    if len(str(value)) == 13:  # timestamp c милисекундами
+        value /= 1000.0
+    return date.fromtimestamp(float(value))
+
+
+# Строковые представления дат по номеру дня (date.toordinal)
+_DATE_STRINGS = {}
+
+
+def _date_to_string(value):
+    # Строковое представление даты, повторяющиеся даты берутся из кэша
+    if value is None:
+        return value
+    day = value.toordinal()
+    try:
+        return _DATE_STRINGS[day]
+    except KeyError:
+        if len(_DATE_STRINGS) >= Serializer.DATE_CACHE_SIZE:
+            _DATE_STRINGS.clear()
+        result = _DATE_STRINGS[day] = date.strftime(
+            value, Serializer.DATE_FORMAT)
+        return result
+
+
+# Преобразования и ограничения значений поля модели
+_FieldRules = namedtuple(
+    '_FieldRules', 'to_record from_record field nullable python_type length')
+
+
 class Serializer:
+    DATE_FORMAT = '%m/%d/%Y'
+
+    # Максимальное кол-во различных дат в кэше строковых представлений
+    DATE_CACHE_SIZE = 10000
+
+    # Максимальное кол-во таблиц преобразований моделей
+    TABLES_SIZE = 256
+
+    # класс типа колонки -> функции преобразования (to_record, from_record),
+    # None - значение не преобразуется
+    _converters = {}
+
+    # конфигурация модели -> {поле: _FieldRules}
+    _tables = {}
+
+    @classmethod
+    def converters(cls, type_):
+        """
+        Функции преобразования значений колонки с типом type_.
+
+        :param type_: Тип колонки sqlalchemy
+        :return: Кортеж (to_record, from_record)
+        """
+        try:
+            return cls._converters[type_.__class__]
+        except KeyError:
+            pass
+
+        try:
+            python_type = type_.python_type
+        except NotImplementedError:
+            python_type = object
+
+        if issubclass(python_type, date):
+            result = (_timestamp_to_date, _date_to_string)
+        else:
+            result = (None, None)
+        cls._converters[type_.__class__] = result
+        return result
+
+    @classmethod
+    def table(cls, model):
+        """
+        Функции преобразования и ограничения значений полей модели.
+
+        Таблица строится один раз для конфигурации модели и служит
+        как для преобразования результатов, так и для валидации
+
+        :param model: Модель
+        :return: Словарь {поле: _FieldRules}
+        """
+        try:
+            return cls._tables[model.cache_key]
+        except KeyError:
+            pass
+
+        table = {}
+        for name in model.fields:
+            field = model.get_field(name)
+            type_ = field.type
+            try:
+                python_type = type_.python_type
+            except NotImplementedError:
+                python_type = object
+            table[name] = _FieldRules(
+                *cls.converters(type_),
+                field=field,
+                nullable=field.expression.nullable,
+                python_type=python_type,
+                length=getattr(type_, 'length', None)
+            )
+
+        if len(cls._tables) >= cls.TABLES_SIZE:
+            cls._tables.clear()
+        cls._tables[model.cache_key] = table
+        return table
+
     @staticmethod
     def to_record(field, value):
-        type_ = field.type
-        if issubclass(type_.python_type, date):
-            if len(str(value)) == 13:  # timestamp c милисекундами
-                value /= 1000.0
-            value = date.fromtimestamp(float(value))
-        return value
+        convert = Serializer.converters(field.type)[0]
+        if convert is None:
+            return value
+        return convert(value)
 
     @staticmethod
     def from_record(value):
         if isinstance(value, date):
-            return date.strftime(value, '%m/%d/%Y')
+            return _date_to_string(value)
         return value
 
 
@@ -193,9 +688,19 @@ class View:
     serialization = staticmethod(Serializer.to_record)
     deserialization = staticmethod(Serializer.from_record)
 
-    def __init__(self, adapters, current_model):
+    def __init__(self, adapters, current_model, model=None):
         self.adapters = adapters
         self._current_model = current_model
+        if model is None:
+            self._get_field = lambda name: getattr(current_model, name)
+            self._serializers = {}
+        else:
+            self._get_field = model.get_field
+            # поле -> преобразования и ограничения значений (_FieldRules)
+            self._serializers = Serializer.table(model)
+        self._schema = self._compile_schema()
+        # набор колонок -> функция преобразования порции строк
+        self._converters = {}
 
     def from_record(self, params):
         """
@@ -214,6 +719,96 @@ class View:
         return {name: self.deserialization(value) for name, value in
                 result.items()}
 
+    def from_records(self, rows):
+        """
+        Controller <- Model для строк результата запроса.
+
+        Строки преобразуются порциями по BATCH_SIZE функцией, которая
+        строится один раз для набора колонок результата
+
+        :param rows: Итерируемый объект строк (KeyedTuple)
+        :return: Генератор словарей
+        """
+        rows = iter(rows)
+        for batch in iter(lambda: list(islice(rows, BATCH_SIZE)), []):
+            yield from self._converter(tuple(batch[0].keys()))(batch)
+
+    def _converter(self, keys):
+        # Функция преобразования порции строк с колонками keys
+        convert = self._converters.get(keys)
+        if convert is not None:
+            return convert
+
+        if not all(isinstance(a, DefaultAdapter) for a in self.adapters):
+            # адаптеры с вычисляемыми полями работают со словарями
+            def convert(batch):
+                return [self.from_record(row._asdict()) for row in batch]
+        else:
+            # выходные поля и колонки, требующие десериализации (даты),
+            # определяются один раз, значения берутся по индексам
+            names = {}
+            for adapter in self.adapters:
+                names.update(adapter.include_exclude(dict.fromkeys(keys)))
+            names = list(names)
+            indexes = [keys.index(name) for name in names]
+            if indexes == list(range(len(keys))):
+                getter = None
+            elif not indexes:
+                # все поля исключены - записи пустые
+                getter = lambda row: ()
+            elif len(indexes) == 1:
+                getter = lambda row, i=indexes[0]: (row[i],)
+            else:
+                getter = operator.itemgetter(*indexes)
+            deserialize = [
+                (name, self._deserializer(name)) for name in names]
+            deserialize = [item for item in deserialize if item[1]]
+
+            def convert(batch):
+                if getter:
+                    batch = map(getter, batch)
+                records = [dict(zip(names, row)) for row in batch]
+                for name, func in deserialize:
+                    for record in records:
+                        record[name] = func(record[name])
+                return records
+
+        self._converters[keys] = convert
+        return convert
+
+    def _deserializer(self, name):
+        # Функция десериализации значений поля или None
+        if self.deserialization is not Serializer.from_record:
+            return self.deserialization
+        try:
+            return self._serializers[name][1]
+        except KeyError:
+            pass
+        try:
+            type_ = self._get_field(name).type
+        except (exc.NameValidationError, AttributeError):
+            # вычисляемая колонка, тип определяется по значению
+            return self.deserialization
+        return Serializer.converters(type_)[1]
+
+    def from_fields(self, fields):
+        """
+        Поля модели, необходимые для from_record.
+
+        Если какой-либо из адаптеров не сообщает о необходимых ему полях
+        (нет метода from_fields), то необходимы все поля
+
+        :param fields: Все поля, выбираемые из модели
+        :return:
+        """
+        required = set()
+        for adapter in self.adapters:
+            if not hasattr(adapter, 'from_fields'):
+                return fields
+            required.update(adapter.from_fields(fields))
+
+        return [field for field in fields if field in required]
+
     def to_record(self, params):
         """
         Controller -> Model.
@@ -231,18 +826,51 @@ class View:
 
         new_params = {}
         for name, value in result.items():
-            field = getattr(self._current_model, name)
+            try:
+                rules = self._schema[name]
+            except KeyError:
+                field = getattr(self._current_model, name)
 
-            # Серриализация перед валидацией
-            value = self.serialization(field, value)
+                # Серриализация перед валидацией
+                value = self.serialization(field, value)
 
-            # Умолчательная валидация на уровне типов значений
-            self.validation(field, value)
+                # Умолчательная валидация на уровне типов значений
+                self.validation(field, value)
+            else:
+                # То же по заранее вычисленной таблице полей
+                if rules.to_record:
+                    value = rules.to_record(value)
+
+                if value is None:
+                    if not rules.nullable:
+                        raise exc.NullValidationError(rules.field)
+                elif not isinstance(value, rules.python_type):
+                    raise exc.TypeValidationError(rules.field, value)
+                elif (rules.length is not None and
+                        len(value) > rules.length):
+                    raise exc.LengthValidationError(rules.field, value)
 
             new_params[name] = value
 
         return new_params
 
+    def to_records(self, records):
+        """
+        Controller -> Model для списка объектов.
+
+        :param records: Список словарей
+        :return: Список словарей
+        """
+        return [self.to_record(record) for record in records]
+
+    def _compile_schema(self):
+        # Схема серриализации и валидации полей - таблица Serializer.table.
+        # Если серриализация или валидация переопределены - схема пустая
+        if (self.serialization is not Serializer.to_record or
+                self.validation is not View.validation):
+            return {}
+        return self._serializers
+
     @staticmethod
     def validation(field, value):
 
@@ -265,19 +893,28 @@ class Service:
 
     to_dict = staticmethod(lambda o: o._asdict())
 
-    def __init__(self, model, adapters, include=None, exclude=None):
+    def __init__(self, model, adapters, include=None, exclude=None,
+                 yield_per=None):
         """.
 
         :param model: Ссылка на модель
         :param adapters: Список адаптеров
         :param include: Список полей для обязательного включения
         :param exclude: Список полей для исключения
+        :param yield_per: Размер порции записей при потоковом чтении
+        (server-side cursor), если не указан - записи читаются целиком
         :return:
         """
-        self._model = model
+        self._yield_per = yield_per
 
         adapters += (DefaultAdapter(model.current, include, exclude),)
-        self._adapter = View(adapters, model.current)
+        self._adapter = View(adapters, model.current, model)
+
+        # Из БД выбираются только поля, попадающие в результат
+        fields = self._adapter.from_fields(model.fields)
+        if fields and len(fields) < len(model.fields):
+            model = model.project(fields)
+        self._model = model
 
     def __call__(self, model=None):
         """
@@ -317,10 +954,42 @@ class Service:
 
     def _read(self, qs):
         # Операция получения списка объектов по кверисету
-        return map(
-            self._adapter.from_record,
-            map(self.to_dict, qs.all())
-        )
+        if self._yield_per:
+            # записи получаются из курсора порциями по мере итерации
+            if isinstance(qs, baked.Result):
+                rows = qs.with_post_criteria(
+                    lambda q: q.yield_per(self._yield_per))
+            else:
+                rows = qs.yield_per(self._yield_per)
+            return Stream(self._adapter.from_records(rows))
+        return self._adapter.from_records(qs.all())
+
+    def _read_seek(self, qs):
+        # Операция получения страницы объектов по кверисету с seek
+        # Возвращает объекты и курсор, указывающий на последний из них
+        records, key = [], []
+        for row in map(self.to_dict, qs.all()):
+            key = []
+            while _KEY_LABEL.format(len(key)) in row:
+                key.append(row.pop(_KEY_LABEL.format(len(key))))
+            records.append(self._adapter.from_record(row))
+        return records, key and _encode_cursor(key) or None
+
+    def _read_page(self, qs):
+        # Операция получения страницы объектов вместе с общим кол-вом
+        # записей, которое вычисляется оконной функцией в том же запросе
+        records, total = [], 0
+        rows = qs.add_columns(
+            func.count().over().label(_TOTAL_LABEL)
+        ).all()
+        for row in map(self.to_dict, rows):
+            total = row.pop(_TOTAL_LABEL)
+            records.append(self._adapter.from_record(row))
+        if not records:
+            # окно не вычислялось (пустая выборка или страница за её
+            # пределами) - общее кол-во получается отдельным запросом
+            total = qs.limit(None).offset(None).order_by(None).count()
+        return records, total
 
     def _exists(self, qs):
         # Операция проверки наличия объекта по кверисету
@@ -338,31 +1007,182 @@ class Service:
             qs.with_entities(self._model.current).update(
                 self._adapter.to_record(params)
             )
+            self._written()
             return self._adapter.from_record(
                 self.to_dict(qs.one())
             )
 
+    def _read_by_ids(self, ids):
+        # Получение объектов по списку идентификаторов в порядке их
+        # следования, по одному запросу на BULK_CHUNK_SIZE идентификаторов
+        key = _KEY_LABEL.format(0)
+        rows = {}
+        for i in range(0, len(ids), BULK_CHUNK_SIZE):
+            qs = _Proxy.query_builder(self._model).build([
+                ('_filter', ('id', 'in', ids[i:i + BULK_CHUNK_SIZE]), {})
+            ])
+            qs = qs.add_columns(self._model.get_field('id').label(key))
+            for row in map(self.to_dict, qs.all()):
+                rows[row.pop(key)] = row
+        try:
+            return [self._adapter.from_record(rows[id_]) for id_ in ids]
+        except KeyError:
+            raise exc.NotFound()
+
+    def _normalize_ids(self, ids):
+        # Приведение идентификаторов к типу первичного ключа ("5" -> 5)
+        try:
+            type_ = self._model.get_field('id').type.python_type
+        except NotImplementedError:
+            return list(ids)
+        try:
+            return [
+                id_ if isinstance(id_, type_) else type_(id_)
+                for id_ in ids
+            ]
+        except (TypeError, ValueError):
+            raise exc.ValidationError('Wrong ids: {0}'.format(ids))
+
     def _delete(self, qs):
         # Операция удаления объекта
         try:
             qs.with_entities(self._model.current).delete()
         except IntegrityError as e:
-            info = getattr(e, 'orig', None)
+            self._reraise_integrity_error(e)
+        self._written()
 
-            # Код ошибки 23503 в postgresql
-            # соответствует имеющимся ссылкам на запись
-            # http://www.postgresql.org/docs/8.2/static/errcodes-appendix.html
-            if info and getattr(info, 'pgcode', None) == '23503':
-                raise exc.BadRequest(
-                    "Record can't be delete, because it has FK")
-
-            raise
+    @staticmethod
+    def _reraise_integrity_error(e):
+        info = getattr(e, 'orig', None)
+
+        # Имеющимся ссылкам на запись соответствуют:
+        # код ошибки 23503 в postgresql
+        # http://www.postgresql.org/docs/8.2/static/errcodes-appendix.html
+        # код ошибки 1451 в mysql, сообщение об ошибке в sqlite
+        # (при включенной проверке внешних ключей)
+        if info and (
+                getattr(info, 'pgcode', None) == '23503' or
+                getattr(info, 'args', ())[:1] == (1451,) or
+                'FOREIGN KEY constraint failed' in str(info)):
+            raise exc.BadRequest(
+                "Record can't be delete, because it has FK")
+
+        raise e
+
+    def _delete_ids(self, ids):
+        # Удаление объектов одним запросом DELETE ... WHERE id IN (...)
+        try:
+            self._model.delete_objects(ids)
+        except IntegrityError as e:
+            self._reraise_integrity_error(e)
+        self._written()
+
+    def _session(self):
+        # Сессия sqlalchemy модели с обработчиками завершения транзакции
+        session = self._model.create_query().session
+        if not event.contains(session, 'after_commit', _committed):
+            event.listen(session, 'after_commit', _committed)
+            event.listen(
+                session, 'after_transaction_end', _transaction_end)
+        return session
+
+    def _written(self):
+        # Запоминание изменения данных таблицы модели для оповещения
+        # после фиксации транзакции
+        self._session().info.setdefault(_WRITTEN_TABLES, set()).add(
+            self._model.current.__table__.name)
+
+    def _after_commit(self, callback):
+        # Вызов функции после фиксации текущей транзакции
+        # (при откате транзакции функция не вызывается)
+        self._session().info.setdefault(_AFTER_COMMIT, []).append(callback)
+
+    def _delete_partially(self, ids):
+        # Удаление с откатом к точке сохранения при наличии ссылок:
+        # набор делится пополам, пока не останутся только объекты,
+        # которые удалить нельзя. Возвращает их идентификаторы
+        try:
+            with self._model.savepoint():
+                self._delete_ids(ids)
+        except exc.BadRequest:
+            if len(ids) == 1:
+                return list(ids)
+            middle = len(ids) // 2
+            return (self._delete_partially(ids[:middle]) +
+                    self._delete_partially(ids[middle:]))
+        return []
 
     # For create & update
     def _deserialize(self, item, value):
         # Преобразования dict -> model object
         return Serializer.to_record(self._model.get_field(item), value)
 
+    def bulk_update(self, records):
+        """
+        Операция изменения списка объектов.
+
+        Объекты с одинаковым набором изменяемых полей изменяются одним
+        запросом, после чего все объекты получаются одним запросом.
+        Если какого-либо объекта нет, возбуждается NotFound
+        :param records: Список объектов (словарей с ключом "id")
+        :return: Список измененных объектов
+        """
+        ids = self._normalize_ids(record['id'] for record in records)
+        changes = []
+        for id_, record in zip(ids, records):
+            params = {}
+            for item, value in record.items():
+                if item != 'id':
+                    params[item] = self._deserialize(item, value)
+            changes.append((
+                id_,
+                self._adapter.to_record(params) if params else {}
+            ))
+
+        self._model.update_objects(
+            (id_, values) for id_, values in changes if values)
+        self._written()
+        return self._read_by_ids(ids)
+
+    def bulk_delete(self, ids, partial=False):
+        """
+        Операция удаления списка объектов.
+
+        Объекты удаляются запросами DELETE ... WHERE id IN (...)
+        на BULK_CHUNK_SIZE идентификаторов
+        :param ids: Список идентификаторов
+        :param partial: Удалить объекты, на которые нет ссылок, вместо
+        отказа (BadRequest) в удалении всего списка. Ссылки распознаются
+        по ошибкам postgresql, mysql и sqlite; ошибки остальных СУБД
+        пробрасываются как есть
+        :return: Список идентификаторов (в исходном виде),
+        которые не удалось удалить
+        """
+        normalized = self._normalize_ids(ids)
+        failed = []
+        for i in range(0, len(normalized), BULK_CHUNK_SIZE):
+            chunk = normalized[i:i + BULK_CHUNK_SIZE]
+            if partial:
+                failed.extend(self._delete_partially(chunk))
+            else:
+                self._delete_ids(chunk)
+        original = dict(zip(normalized, ids))
+        return [original[id_] for id_ in failed]
+
+    def bulk_create(self, records):
+        """
+        Операция создания списка объектов.
+
+        :param records: Список данных об объектах
+        :return: Список созданных объектов
+        """
+        created = self._model.create_objects(
+            self._adapter.to_records(records),
+            chunk_size=BULK_CHUNK_SIZE
+        )
+        self._written()
+        return [self._adapter.from_record(row) for row in created]
+
     def create(self, **kwargs):
         """
         Операция создания объекта.
@@ -373,8 +1193,23 @@ class Service:
         obj = self._model.create_object(
             **self._adapter.to_record(kwargs)
         )
+        self._written()
         as_dict = {x.name: getattr(obj, x.name) for x in obj.__table__.columns}
         return self._adapter.from_record(as_dict)
 
+    def upsert(self, keys, **kwargs):
+        """
+        Операция создания объекта с заменой существующего.
+
+        Объект заменяется одним запросом, если по полям keys есть
+        уникальное ограничение, иначе - удалением и созданием
+        (см. Model.upsert_object)
+        :param keys: Список полей, по значениям которых заменяется объект
+        :param kwargs:
+        :return:
+        """
+        self._model.upsert_object(keys, **self._adapter.to_record(kwargs))
+        self._written()
+
 
-__all__ = ('Service',)
+__all__ = ('Service', 'QueryCache', 'query_cache', 'on_write')
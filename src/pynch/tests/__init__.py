@@ -1,8 +1,11 @@
 # coding: utf-8
 """Преднастроенные конструкции для всех тестов."""
 
+from contextlib import contextmanager
 import os
 
+from sqlalchemy import event
+
 from pynch.core import init
 from pynch.schema import DBMapper
 
@@ -56,3 +59,42 @@ def create_api(*path):
             return f(fend.api, *args, **kwargs)
         return wrap
     return inner
+
+
+@contextmanager
+def patched(obj, name, value):
+    """
+    Подмена атрибута объекта на время выполнения блока.
+
+    :param obj: Объект (модуль, класс)
+    :param name: Имя атрибута
+    :param value: Значение атрибута внутри блока
+    :return:
+    """
+    original = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield value
+    finally:
+        setattr(obj, name, original)
+
+
+@contextmanager
+def captured_statements(api):
+    """
+    Список SQL-запросов, выполненных API за время выполнения блока.
+
+    :param api: API с сессией "default"
+    :return:
+    """
+    statements = []
+    engine = api._container.get('session', 'default').engine
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_execute)
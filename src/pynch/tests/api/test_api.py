@@ -1,9 +1,19 @@
 # coding: utf-8
 
+from datetime import date, datetime as dt
+from threading import Thread
+import time
+
 import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.compiler import SQLCompiler
 
 import pynch.exceptions as exc
-from pynch.tests import create_api
+from pynch.adapter import DefaultAdapter
+from pynch.schema import Model
+import pynch.service
+from pynch.service import QueryCache, Serializer, View, query_cache
+from pynch.tests import captured_statements, create_api, patched
 
 
 def generate_series(f):
@@ -62,6 +72,44 @@ def test_create(api):
     assert data['id'] == 1
 
 
+@get_api
+def test_bulk_create(api):
+    data = api.call(
+        'SimpleController', 'bulk_create',
+        records=[
+            {'name': 'first'},
+            {'name': 'second', 'lname': 'last'},
+            {'name': 'third'},
+        ]
+    )
+    assert [(r['id'], r['name'], r['lname']) for r in data] == [
+        (1, 'first', None),
+        (2, 'second', 'last'),
+        (3, 'third', None),
+    ]
+    assert len(list(api.call('SimpleController', 'read'))) == 3
+
+    with pytest.raises(exc.NullValidationError):
+        api.call(
+            'SimpleController', 'bulk_create',
+            records=[{'name': 'ok'}, {'name': None}]
+        )
+
+
+@get_api
+def test_bulk_create_executemany(api):
+    with captured_statements(api) as statements:
+        data = api.call(
+            'SimpleController', 'bulk_create',
+            records=[{'name': 'name %d' % i} for i in range(10)]
+        )
+
+    assert [(r['id'], r['name']) for r in data] == [
+        (i + 1, 'name %d' % i) for i in range(10)]
+    # один INSERT с набором параметров и один SELECT
+    assert len([s for s in statements if s.startswith('INSERT')]) == 1
+
+
 @get_api
 def test_update(api):
     api.call(
@@ -88,6 +136,50 @@ def test_update(api):
     assert data['id'] == 1
 
 
+@get_api
+@generate_series
+def test_bulk_update(api):
+    data = api.call(
+        'SimpleController', 'bulk_update',
+        records=[
+            {'id': 7, 'name': 'seventh', 'lname': 'last'},
+            {'id': 3, 'name': 'third'},
+            {'id': 5, 'name': 'fifth', 'lname': 'last'},
+            {'id': 9},
+        ]
+    )
+    assert [(r['id'], r['name'], r['lname']) for r in data] == [
+        (7, 'seventh', 'last'),
+        (3, 'third', None),
+        (5, 'fifth', 'last'),
+        (9, 'data 8', None),
+    ]
+
+    data = api.call('SimpleController', 'get', id=3)
+    assert data['name'] == 'third'
+
+
+@get_api
+@generate_series
+def test_bulk_update_ids(api):
+    data = api.call(
+        'SimpleController', 'bulk_update',
+        records=[{'id': '3', 'name': 'third'}]
+    )
+    assert [(r['id'], r['name']) for r in data] == [(3, 'third')]
+
+    with pytest.raises(exc.NotFound):
+        api.call(
+            'SimpleController', 'bulk_update',
+            records=[{'id': 3}, {'id': 1000, 'name': 'missing'}]
+        )
+    with pytest.raises(exc.ValidationError):
+        api.call(
+            'SimpleController', 'bulk_update',
+            records=[{'id': 'third', 'name': 'third'}]
+        )
+
+
 @get_api
 def test_delete(api):
     api.call(
@@ -123,6 +215,209 @@ def test_read(api):
         assert 'data {0}'.format(j) == data[i]['name']
 
 
+@get_api
+@generate_series
+def test_stream_read(api):
+    data = api.call(
+        'StreamController', 'read',
+        start=10, limit=15
+    )
+    assert not isinstance(data, list)
+    data = list(data)
+
+    assert len(data) == 15
+    for i, j in enumerate(range(10, 25)):
+        assert 'data {0}'.format(j) == data[i]['name']
+
+    assert len(list(api.call('StreamController', 'read'))) == 100
+
+
+@get_api
+@generate_series
+def test_keyset_read(api):
+    sort = [{'property': 'name', 'direction': 'DESC'}]
+    names, cursor = [], ''
+    while cursor is not None:
+        page = api.call(
+            'SimpleController', 'read',
+            limit=15, sort=sort, cursor=cursor,
+            filter=[{'property': 'id', 'operator': 'gt', 'value': 10}]
+        )
+        assert len(page['records']) <= 15
+        names.extend(record['name'] for record in page['records'])
+        cursor = page['cursor']
+
+    assert names == sorted(
+        ('data {0}'.format(i) for i in range(10, 100)), reverse=True)
+
+    with pytest.raises(exc.ValidationError):
+        api.call(
+            'SimpleController', 'read', limit=15, sort=sort, cursor='bad')
+
+
+@get_api
+def test_keyset_read_with_nulls(api):
+    for i in range(10):
+        api.call('SimpleController', 'create', data={
+            'name': 'data {0}'.format(i),
+            'lname': None if i % 3 else 'last {0}'.format(i % 2)
+        })
+
+    for direction in ('ASC', 'DESC'):
+        sort = [{'property': 'lname', 'direction': direction}]
+        ids, cursor = [], ''
+        while cursor is not None:
+            page = api.call(
+                'SimpleController', 'read',
+                limit=3, sort=sort, cursor=cursor
+            )
+            ids.extend(record['id'] for record in page['records'])
+            cursor = page['cursor']
+
+        # NULL больше любого значения, при равенстве - по id
+        expected = sorted(
+            api.call('SimpleController', 'read'), key=lambda r: r['id'])
+        expected.sort(
+            key=lambda r: (r['lname'] is None, r['lname'] or ''),
+            reverse=direction == 'DESC')
+        assert ids == [record['id'] for record in expected], direction
+
+
+@get_api
+@generate_series
+def test_read_with_total(api):
+    page = api.call(
+        'SimpleController', 'read',
+        start=10, limit=15, total=1,
+        sort=[{'property': 'id', 'direction': 'ASC'}],
+        filter=[{'property': 'id', 'operator': 'gt', 'value': 20}]
+    )
+    assert page['total'] == 80
+    assert [r['id'] for r in page['records']] == list(range(31, 46))
+
+    page = api.call(
+        'SimpleController', 'read', start=1000, limit=15, total=1)
+    assert page == {'records': [], 'total': 100}
+
+
+@get_api
+@generate_series
+def test_query_template_cache(api):
+    query_cache.clear()
+
+    def read(value, start):
+        return [r['id'] for r in api.call(
+            'SimpleController', 'read',
+            start=start, limit=5,
+            sort=[{'property': 'id', 'direction': 'DESC'}],
+            filter=[{'property': 'id', 'operator': 'le', 'value': value}]
+        )]
+
+    # одинаковая структура запроса - один шаблон с разными параметрами
+    assert read(50, 0) == [50, 49, 48, 47, 46]
+    assert read(20, 10) == [10, 9, 8, 7, 6]
+    assert query_cache.info()['misses'] == 1
+    assert query_cache.info()['hits'] == 1
+
+    data = api.call(
+        'SimpleController', 'read',
+        filter=[{'property': 'id', 'operator': 'in', 'value': [3, 7]}])
+    assert [r['id'] for r in data] == [3, 7]
+    data = api.call(
+        'SimpleController', 'read',
+        filter=[{'property': 'id', 'operator': 'in', 'value': [1, 2, 5]}])
+    assert [r['id'] for r in data] == [1, 2, 5]
+    assert query_cache.hit_rate == 0.5
+
+
+def test_query_cache_threads():
+    cache = QueryCache(size=8)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(2000):
+                key = (n + i) % 16
+                assert cache.get(key, lambda: key) == key
+        except Exception as e:
+            errors.append(e)
+
+    threads = [Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    info = cache.info()
+    assert info['size'] <= 8
+    assert info['hits'] + info['misses'] == 8 * 2000
+
+
+@get_api
+@generate_series
+def test_bulk_destroy(api):
+    data = api.call(
+        'SimpleController', 'bulk_destroy', identifiers=list(range(1, 51)))
+    assert data == list(range(1, 51))
+    assert len(list(api.call('SimpleController', 'read'))) == 50
+
+
+@get_api
+@generate_series
+def test_bulk_destroy_partial(api):
+    class FKViolation(Exception):
+        pgcode = '23503'
+
+    delete_objects = Model.delete_objects
+
+    def delete_referenced(self, ids):
+        # объекты 13 и 42 имеют "ссылки"
+        if {13, 42} & set(ids):
+            raise IntegrityError('DELETE', ids, FKViolation())
+        return delete_objects(self, ids)
+
+    with patched(Model, 'delete_objects', delete_referenced):
+        with pytest.raises(exc.BadRequest):
+            api.call(
+                'SimpleController', 'bulk_destroy', identifiers=[1, 13])
+
+        # идентификаторы приводятся к типу ключа, но возвращаются как есть
+        data = api.call(
+            'SimpleController', 'bulk_destroy',
+            identifiers=['12', '13'], partial=1)
+        assert data == {'deleted': ['12'], 'failed': ['13']}
+
+        data = api.call(
+            'SimpleController', 'bulk_destroy',
+            identifiers=list(range(1, 101)), partial=1)
+
+    assert data['failed'] == [13, 42]
+    assert len(data['deleted']) == 98
+    assert [r['id'] for r in api.call('SimpleController', 'read')] == [
+        13, 42]
+
+
+@get_api
+@generate_series
+def test_write_listeners_after_savepoint(api):
+    written = []
+    service = api._container.get('service', 'SimpleService')
+    session = api._container.get('session', 'default')
+    session.commit()
+
+    with patched(pynch.service, '_write_listeners', [written.append]):
+        assert service.bulk_delete([1, 2], partial=True) == []
+        # точки сохранения освобождены, но транзакция не зафиксирована
+        assert written == []
+        session.rollback()
+        assert written == []
+
+        assert service.bulk_delete([1, 2], partial=True) == []
+        session.commit()
+        assert written == ['simple_table']
+
+
 @get_api
 @generate_series
 def test_sorts(api):
@@ -238,6 +533,31 @@ def test_create_with_adapters(api):
     assert data['full_name'] == "Complex, field"
 
 
+@get_api
+def test_projection_pushdown(api):
+    api.call('SimpleController', 'create', data={
+        'name': 'name', 'lname': 'lname', 'oname': 'oname'})
+
+    with captured_statements(api) as statements:
+        data = api.call('NarrowController', 'get', id=1)
+
+    assert data == {'id': 1, 'name': 'name'}
+    # исключенные поля не выбираются из БД
+    assert 'lname' not in statements[-1]
+    assert 'oname' not in statements[-1]
+
+
+@get_api
+@generate_series
+def test_rows_without_output_fields(api):
+    model = api._container.get('model', 'simple_model')
+    view = View(
+        [DefaultAdapter(model.current, [], model.fields)],
+        model.current, model)
+    rows = model.create_query().limit(3).all()
+    assert list(view.from_records(rows)) == [{}, {}, {}]
+
+
 @get_api
 def test_create_with_wrong_name_adapters(api):
     with pytest.raises(exc.NameValidationError):
@@ -292,6 +612,74 @@ def test_complex_filter_detail(api):
     assert data[1]['name'] == 'master 1; detail 12'
 
 
+@get_api
+@generate_master_detail_series
+def test_compiled_query_cache(api):
+    compiled = []
+    init = SQLCompiler.__init__
+
+    def counting_init(self, *args, **kwargs):
+        compiled.append(self)
+        init(self, *args, **kwargs)
+
+    def read(value):
+        return [r['name'] for r in api.call(
+            'Detail', 'read',
+            filter=[{'property': 'master.name',
+                     'operator': 'eq',
+                     'value': value}],
+            sort=[{'property': 'id', 'direction': 'ASC'}]
+        )]
+
+    with patched(SQLCompiler, '__init__', counting_init):
+        assert read('master 1')[:2] == ['master 1; detail 0',
+                                        'master 1; detail 1']
+        assert len(compiled) == 1
+        # запрос той же структуры не компилируется повторно
+        assert read('master 2')[0] == 'master 2; detail 0'
+        assert len(compiled) == 1
+
+
+@get_api
+@generate_series
+def test_custom_query_builder(api):
+    class OddOnly(pynch.service._QuerySetBuilder):
+        def _filter(self, property, operator, *args, **kwargs):
+            super()._filter(property, operator, *args, **kwargs)
+            self._qs = self._qs.filter(
+                self._model.get_field('id') % 2 == 1)
+
+    class OldBuild(pynch.service._QuerySetBuilder):
+        def build(self, queue):
+            return super().build(queue)
+
+    assert not OddOnly.templated
+    assert not OldBuild.templated
+    filter_ = [{'property': 'id', 'operator': 'le', 'value': 4}]
+    for builder, ids in ((OddOnly, [1, 3]), (OldBuild, [1, 2, 3, 4])):
+        with patched(pynch.service._Proxy, 'query_builder', builder):
+            # повторный запрос той же структуры не берётся из кэша
+            for _ in range(2):
+                assert [r['id'] for r in api.call(
+                    'SimpleController', 'read', filter=filter_
+                )] == ids
+
+
+@get_api
+@generate_series
+def test_bake_key(api):
+    model = api._container.get('model', 'simple_model')
+    session = model.create_query().session
+    with pytest.raises(TypeError):
+        model.bake(5, lambda qs: qs)
+
+    # одинаковые значения в разных пространствах имен - разные запросы
+    first = model.bake(('test.first', 1), lambda qs: qs.limit(1))
+    second = model.bake(('test.second', 1), lambda qs: qs.limit(2))
+    assert len(first(session).all()) == 1
+    assert len(second(session).all()) == 2
+
+
 # В sqlite тест ниже не работает с параметром RESTRICT
 # Видимо, всегда работает как каскадное (CASCADE) удаление
 @get_api
@@ -347,6 +735,55 @@ def test_date(api):
     assert data['date'] == dt.fromtimestamp(timestamp).strftime(format_)
 
 
+@get_api
+def test_read_batches(api):
+    timestamp = time.time()
+    for i in range(5):
+        api.call('Types', 'create', data={'date': timestamp})
+        api.call('AdapterController', 'create', data={
+            'name': 'name {0}'.format(i),
+            'full_name': 'last {0}, other'.format(i)
+        })
+
+    with patched(pynch.service, 'BATCH_SIZE', 2):
+        types = list(api.call('Types', 'read'))
+        adapted = list(api.call('AdapterController', 'read'))
+
+    formatted = dt.fromtimestamp(timestamp).strftime('%m/%d/%Y')
+    assert types == [{'id': i, 'date': formatted} for i in range(1, 6)]
+    assert adapted[4] == {
+        'id': 5, 'name': 'name 4', 'full_name': 'last 4, other'}
+
+
+@get_api
+def test_serializer_table(api):
+    types = api._container.get('model', 'types')
+    table = Serializer.table(types)
+    # таблица строится один раз для конфигурации модели
+    assert Serializer.table(api._container.get('model', 'types')) is table
+
+    rules = table['date']
+    assert rules.to_record(None) is None
+    assert rules.from_record(date(2015, 3, 1)) == '03/01/2015'
+    assert rules.from_record(dt(2015, 3, 1, 12)) == '03/01/2015'
+    assert not rules.nullable
+    assert rules.python_type is date
+    assert table['id'][:2] == (None, None)
+
+    # та же таблица служит схемой валидации записей
+    service = api._container.get('service', 'TypesService')
+    assert service._adapter._schema is table
+
+
+@get_api
+def test_update_date(api):
+    api.call('Types', 'create', data={'date': 1420070400})
+    timestamp = 1425168000000  # timestamp c милисекундами
+    data = api.call('Types', 'update', id=1, data={'date': timestamp})
+    assert data['date'] == dt.fromtimestamp(
+        timestamp / 1000.0).strftime('%m/%d/%Y')
+
+
 @get_api
 def test_create_with_wrong_data(api):
     with pytest.raises(exc.NameValidationError):
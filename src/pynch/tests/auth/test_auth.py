@@ -1,8 +1,9 @@
 # coding: utf-8
 import pytest
 
+from pynch.auth.service import AuthorizationService, _permissions
 import pynch.exceptions as exc
-from pynch.tests import create_api
+from pynch.tests import captured_statements, create_api
 from pynch.tests.auth import ADMIN_SESSION, USER_SESSION
 
 
@@ -178,9 +179,259 @@ def test_permissions_actions(api):
         }],
         _web_session_id=ADMIN_SESSION
     )
+    data = list(data)
+    assert all(item['allowed'] for item in data)  # суперроль
     data = list(item['action'] for item in data)
     assert 'get' in data
     assert 'read' in data
     assert 'destroy' in data
     assert 'create' in data
     assert 'update' in data
+
+
+@get_api
+def test_has_perms(api):
+    """
+    Проверка прав на список действий и проверка без кэширования
+    """
+    container = api._container
+    service = container.get('service', 'AuthorizationService')
+    uncached = AuthorizationService(
+        user_role=container.get('model', 'user_role'),
+        model=container.get('model', 'user_role_permission'),
+        adapters=(),
+        perm_ttl=0
+    )
+    perms = [('User', 'read'), ('User', 'get'), ('Role', 'read')]
+    for auth in (service, uncached):
+        # администратор - суперпользователь
+        assert auth.has_perms(1, perms) == [True, True, True]
+        assert auth.has_perms(2, perms) == [True, False, False]
+
+        assert auth.has_perm(1, 'Role', 'destroy')
+        assert auth.has_perm(2, 'User', 'read')
+        assert not auth.has_perm(2, 'User', 'get')
+        assert not auth.has_perm(3, 'User', 'read')
+
+
+@get_api
+def test_permissions_cache_invalidation(api):
+    """
+    Изменение прав через сервисы сбрасывает кэш прав
+    """
+    # права пользователя попадают в кэш
+    assert list(api.call('User', 'read', _web_session_id=USER_SESSION))
+    with pytest.raises(exc.Forbidden):
+        api.call('User', 'get', id=1, _web_session_id=USER_SESSION)
+
+    perm = api.call(
+        'RolePermission', 'create',
+        data={'role_id': 2, 'controller': 'User', 'action': 'get'},
+        _web_session_id=ADMIN_SESSION
+    )
+    data = api.call('User', 'get', id=1, _web_session_id=USER_SESSION)
+    assert data['login'] == 'administrator'
+
+    api.call(
+        'RolePermission', 'destroy', id=perm['id'],
+        _web_session_id=ADMIN_SESSION
+    )
+    with pytest.raises(exc.Forbidden):
+        api.call('User', 'get', id=1, _web_session_id=USER_SESSION)
+
+
+@get_api
+def test_permissions_invalidation_after_commit(api):
+    """
+    Кэш прав сбрасывается после фиксации транзакции, а не при изменении
+    """
+    container = api._container
+    auth = container.get('service', 'AuthorizationService')
+    session = container.get('session', 'default')
+    assert not auth.has_perm(2, 'User', 'get')
+
+    container.get('service', 'RolePermissionService').create(
+        role_id=2, controller='User', action='get')
+    # права, прочитанные до фиксации другой транзакцией, попадают в кэш
+    _permissions.set((auth._model.cache_key, 2), (False, frozenset()))
+    assert not auth.has_perm(2, 'User', 'get')
+    session.commit()
+    assert auth.has_perm(2, 'User', 'get')
+
+    container.get('service', 'RolePermissionService').filter(
+        'role_id', 'eq', 2).delete()
+    session.rollback()
+    assert auth.has_perm(2, 'User', 'get')
+
+
+@get_api
+def test_session_cache_after_commit(api):
+    """
+    Кэш сессий заполняется и очищается после фиксации транзакции
+    """
+    container = api._container
+    auth = container.get('service', 'AuthenticationService')
+    session = container.get('session', 'default')
+    cache = auth.session_cache
+    session.commit()
+
+    assert auth.login('bar', 'barbar', 'bar-session')
+    session.rollback()
+    assert cache.get('bar-session') is None
+    with pytest.raises(exc.NotFound):
+        auth.is_logged_in('bar-session')
+
+    assert auth.login('bar', 'barbar', 'bar-session')
+    assert cache.get('bar-session') is None
+    session.commit()
+    assert cache.get('bar-session') == 2
+
+    assert auth.logout('bar-session')
+    assert cache.get('bar-session') == 2
+    session.commit()
+    assert cache.get('bar-session') is None
+
+
+@get_api
+def test_session_cache_after_savepoint(api):
+    """
+    Вход в точке сохранения кэшируется только после фиксации транзакции
+    """
+    container = api._container
+    auth = container.get('service', 'AuthenticationService')
+    session = container.get('session', 'default')
+    cache = auth.session_cache
+    session.commit()
+
+    with session.begin_nested():
+        assert auth.login('bar', 'barbar', 'bar-session')
+    assert cache.get('bar-session') is None
+    session.rollback()
+    assert cache.get('bar-session') is None
+
+    with session.begin_nested():
+        assert auth.login('bar', 'barbar', 'bar-session')
+    session.commit()
+    assert cache.get('bar-session') == 2
+
+
+@get_api
+def test_logout(api):
+    """
+    Выход из системы удаляет сессию (в т.ч. из кэша сессий)
+    """
+    assert api.call(
+        "Authentication", "login",
+        login='bar', password='barbar', _web_session_id='bar-session')
+    assert list(api.call('User', 'read', _web_session_id='bar-session'))
+
+    assert api.call(
+        "Authentication", "logout", _web_session_id='bar-session') is True
+    assert api.call(
+        "Authentication", "logout", _web_session_id='bar-session') is False
+    with pytest.raises(exc.Unauthorized):
+        api.call('User', 'read', _web_session_id='bar-session')
+
+
+@get_api
+def test_login_upsert(api):
+    """
+    Сессия пользователя заменяется при входе одним запросом
+    """
+    with captured_statements(api) as statements:
+        assert api.call(
+            "Authentication", "login",
+            login='bar', password='barbar', _web_session_id='bar-session')
+
+    writes = [s for s in statements if 'web_session' in s and
+              not s.lstrip().startswith('SELECT')]
+    assert len(writes) == 1
+    assert 'ON CONFLICT (user_id) DO UPDATE' in writes[0]
+
+    assert list(api.call('User', 'read', _web_session_id='bar-session'))
+    with pytest.raises(exc.Unauthorized):
+        api.call('User', 'read', _web_session_id=USER_SESSION)
+
+
+@get_api
+def test_login_session_collision(api):
+    """
+    Сессия другого пользователя не заменяется при входе
+    """
+    # фиксация тестовых данных до отката транзакции с ошибкой
+    assert list(api.call('User', 'read', _web_session_id=USER_SESSION))
+    with pytest.raises(exc.ValidationError):
+        api.call(
+            "Authentication", "login",
+            login='bar', password='barbar', _web_session_id=ADMIN_SESSION)
+    assert list(api.call('User', 'read', _web_session_id=ADMIN_SESSION))
+    assert list(api.call('User', 'read', _web_session_id=USER_SESSION))
+
+
+@get_api
+def test_login_keeps_permissions_cache(api):
+    """
+    Вход в систему не сбрасывает кэш прав
+    """
+    assert list(api.call('User', 'read', _web_session_id=USER_SESSION))
+    cached = len(_permissions)
+    assert cached
+    assert api.call(
+        "Authentication", "login",
+        login='bar', password='barbar', _web_session_id='bar-session')
+    assert len(_permissions) == cached
+
+
+@get_api
+def test_user_update_keeps_permissions_cache(api):
+    """
+    Изменение данных пользователя не сбрасывает кэш прав
+    """
+    auth = api._container.get('service', 'AuthorizationService')
+    key = (auth._model.cache_key, 2)
+    assert list(api.call('User', 'read', _web_session_id=USER_SESSION))
+    cached = _permissions.get(key)
+    assert cached
+    api.call(
+        'User', 'update', id=2, data={'email': 'bar@example.com'},
+        _web_session_id=ADMIN_SESSION)
+    assert _permissions.get(key) is cached
+
+
+@get_api
+def test_permissions_invalidation_after_savepoint(api):
+    """
+    Освобождение точки сохранения не сбрасывает кэш прав до фиксации
+    """
+    container = api._container
+    auth = container.get('service', 'AuthorizationService')
+    session = container.get('session', 'default')
+    assert not auth.has_perm(2, 'User', 'get')
+
+    with session.begin_nested():
+        container.get('service', 'RolePermissionService').create(
+            role_id=2, controller='User', action='get')
+    _permissions.set((auth._model.cache_key, 2), (False, frozenset()))
+    assert not auth.has_perm(2, 'User', 'get')
+    session.commit()
+    assert auth.has_perm(2, 'User', 'get')
+
+
+@get_api
+def test_upsert_without_unique_keys(api):
+    """
+    Без уникального ограничения по ключам объекты заменяются
+    удалением и созданием
+    """
+    model = api._container.get('model', 'permission')
+    session = api._container.get('session', 'default')
+    table = model.current.__table__
+
+    with captured_statements(api) as statements:
+        model.upsert_object(
+            ('role_id',), role_id=2, controller='Role', action='read')
+    rows = session.execute(
+        table.select().where(table.c.role_id == 2)).fetchall()
+    assert [(r.controller, r.action) for r in rows] == [('Role', 'read')]
+    assert [s.split()[0] for s in statements] == ['DELETE', 'INSERT']
+    assert 'ON CONFLICT' not in statements[1]
@@ -0,0 +1,138 @@
+# coding: utf-8
+
+import os
+
+import pytest
+
+import pynch.exceptions as exc
+from pynch.auth.sessions import (
+    FileSessionStore, MemorySessionStore, SessionCache, SharedSessionCache)
+from pynch.tests import create_api
+
+
+get_api = create_api('auth', 'api.json')
+
+
+@pytest.fixture(params=['memory', 'file'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        return SessionCache(size=10, ttl=60)
+    return SharedSessionCache(str(tmp_path / 'sessions.db'), ttl=60)
+
+
+def test_session_cache(cache):
+    """
+    Запись, удаление сессии и всех сессий пользователя
+    """
+    cache.set('a', 1)
+    cache.set('b', 1)
+    cache.set('c', 2)
+    assert cache.get('a') == 1
+    assert cache.get('unknown') is None
+
+    cache.discard('a')
+    assert cache.get('a') is None
+
+    cache.discard_user(1)
+    assert cache.get('b') is None
+    assert cache.get('c') == 2
+
+
+def test_shared_session_cache(tmp_path):
+    """
+    Кэш в файле виден всем его экземплярам (процессам)
+    """
+    path = str(tmp_path / 'sessions.db')
+    first, second = SharedSessionCache(path), SharedSessionCache(path)
+    first.set('a', 1)
+    assert second.get('a') == 1
+    second.discard_user(1)
+    assert first.get('a') is None
+
+    expired = SharedSessionCache(path, ttl=-1)
+    expired.set('b', 2)
+    assert first.get('b') is None
+
+
+@pytest.fixture(params=['memory', 'file'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemorySessionStore()
+    return FileSessionStore(str(tmp_path / 'sessions.db'))
+
+
+def test_session_store(store):
+    """
+    Создание и удаление сессий, у пользователя одна сессия
+    """
+    store.create('a', 1)
+    store.create('b', 2)
+    assert store.get('a') == 1
+    assert store.get('unknown') is None
+
+    store.create('c', 1)
+    assert store.get('a') is None
+    assert store.get('c') == 1
+
+    assert store.delete('c') is True
+    assert store.delete('c') is False
+    assert store.get('c') is None
+    assert store.get('b') == 2
+
+
+def test_file_session_store(tmp_path):
+    """
+    Хранилище в файле видно всем его экземплярам (процессам)
+    """
+    path = str(tmp_path / 'sessions.db')
+    first, second = FileSessionStore(path), FileSessionStore(path)
+    first.create('a', 1)
+    assert second.get('a') == 1
+    assert second.delete('a') is True
+    assert first.get('a') is None
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_file_session_store_fork(tmp_path):
+    """
+    Процесс, порождённый fork, открывает собственное соединение
+    """
+    store = FileSessionStore(str(tmp_path / 'sessions.db'))
+    # соединение не открывается при создании хранилища
+    assert getattr(store._local, 'conn', None) is None
+    store.create('a', 1)
+    parent = store._connection()
+
+    pid = os.fork()
+    if not pid:
+        ok = False
+        try:
+            ok = store._connection() is not parent and store.get('a') == 1
+            store.create('b', 2)
+        finally:
+            os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert store._connection() is parent
+    assert store.get('b') == 2
+
+
+@get_api
+def test_configured_session_store(api):
+    """
+    Хранилище сессий задается в конфигурации контейнера
+    """
+    get_service = lambda: api._container.get(
+        'service', 'MemoryAuthenticationService')
+    service = get_service()
+    assert isinstance(service.session_store, MemorySessionStore)
+    assert service.session_cache is None
+
+    assert service.login('bar', 'barbar', 'bar-session')
+    assert get_service().is_logged_in('bar-session') == 2
+    # таблица сессий не используется
+    assert not service.filter('web_session_id', 'eq', 'bar-session').exists()
+
+    assert get_service().logout('bar-session') is True
+    with pytest.raises(exc.NotFound):
+        service.is_logged_in('bar-session')
@@ -1,6 +1,10 @@
 # coding:utf-8
 
+from pytest import raises
+
 from pynch import core
+from pynch.exceptions import ValidationError
+from pynch.validators import ValidationPlan
 
 
 class FakeRouter:
@@ -148,3 +152,72 @@ def test_complex_example():
     }, container_clz=LocalContainer, get_config=lambda x: x)
 
     assert real_api.populate('GET', '/cont/42/add') == 142
+
+
+def test_validation_plan():
+    """Tests the precompiled validation plan"""
+    validate = ValidationPlan([
+        {'name': 'x', 'in': 'path', 'type': 'integer'},
+        {'name': 'y', 'in': 'query', 'type': 'integer', 'required': True},
+        {'name': 'z', 'in': 'query', 'type': 'string'},
+    ])
+    assert validate.required == {'y'}
+
+    query = {'y': '2', 'other': 1}
+    assert validate({'x': '1'}, query) == {'x': 1, 'y': 2}
+    assert query == {'other': 1}
+
+    with raises(ValidationError):
+        validate({}, {})
+
+    with raises(ValidationError):
+        ValidationPlan([{'name': 'x', 'in': 'path', 'type': 'unknown'}])
+
+
+def test_validation_plan_unsupported_format():
+    """Unsupported formats fail on call, not when the plan is built"""
+    validate = ValidationPlan([
+        {'name': 'x', 'in': 'query', 'type': 'integer'},
+        {'name': 'd', 'in': 'query', 'type': 'string', 'format': 'date'},
+    ])
+    assert validate({}, {'x': '1'}) == {'x': 1}
+
+    with raises(ValidationError):
+        validate({}, {'d': '2015-01-01'})
+
+
+def test_dispatch_cache():
+    """Tests the dispatch table for singleton controllers"""
+
+    class FakeContainer:
+        calls = []
+
+        class Math:
+
+            @staticmethod
+            def add(a, b):
+                return a + b
+
+        @classmethod
+        def get(cls, grp, name):
+            cls.calls.append(name)
+            return cls.Math
+
+        @classmethod
+        def itergroup(cls, grp):
+            return [
+                ('math', {'__type__': 'singleton'}, cls.Math),
+                ('other', {}, cls.Math),
+            ]
+
+    api = core.API(
+        container=FakeContainer, middleware=[], dispatch_cache=True)
+    assert FakeContainer.calls == ['math']
+
+    assert api.call('math', 'add', a=1, b=2) == 3
+    assert api.call('other', 'add', a=1, b=2) == 3
+    assert FakeContainer.calls == ['math', 'other']
+
+    api.invalidate('math')
+    assert api.call('math', 'add', a=1, b=2) == 3
+    assert FakeContainer.calls == ['math', 'other', 'math']
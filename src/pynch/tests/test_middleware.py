@@ -2,7 +2,10 @@
 
 from yadic.container import Container
 
+from pynch.auth.middleware import authentication, authorization
 from pynch.core import API
+from pynch.middleware import transact
+from pynch.util import Stream
 
 
 def inc_a(next, controller, action, **params):
@@ -63,10 +66,11 @@ class FakeContainer(Container):
         return iter([])
 
 
-def make_api(*middleware):
+def make_api(*middleware, **kwargs):
     return API(
         container=FakeContainer({}),
-        middleware=middleware
+        middleware=middleware,
+        **kwargs
     )
 
 
@@ -92,3 +96,90 @@ def test_middleware_context():
         ensure_presense_of(a=1, b="B")
     )
     api.call('Controller', 'real_action')
+
+
+def test_compiled_middlewares():
+    api = make_api(
+        inc_a,
+        inject_b(42),
+        replace_action_to('real_action'),
+        compiled=True
+    )
+    assert api.call('Controller', 'action', a=1) == {'a': 2, 'b': 42}
+
+    api = make_api(
+        add_to_context(a=1, b="B"),
+        ensure_presense_of(a=1, b="B"),
+        compiled=True
+    )
+    assert api.call('Controller', 'real_action') == {}
+
+
+def test_per_controller_chains():
+    skipped = inject_b(42)
+    skipped.white_list = frozenset(['Controller'])
+
+    api = make_api(
+        skipped,
+        replace_action_to('real_action'),
+        per_controller=True
+    )
+    assert api.call('Controller', 'action', a=1) == {'a': 1}
+    assert list(api._chains) == ['Controller']
+
+
+def test_white_list_bypass_in_all_modes():
+    middleware = (
+        authentication(None, white_list=['Controller']),
+        authorization(None, white_list=['Controller']),
+        replace_action_to('real_action')
+    )
+    expected = {'a': 1, '_web_session_id': None}
+    for mode in ({}, {'compiled': True}, {'per_controller': True}):
+        api = make_api(*middleware, **mode)
+        assert api.call('Controller', 'action', a=1) == expected, mode
+        assert api.call(
+            'Controller', 'action', a=1, _web_session_id='sid'
+        ) == dict(expected, _web_session_id='sid'), mode
+
+
+def test_transact_lazy_result():
+    log = []
+
+    class Session:
+        commit = staticmethod(lambda: log.append('commit'))
+        rollback = staticmethod(lambda: log.append('rollback'))
+
+    def lazy(next, controller, action, **params):
+        return (log.append(i) or i for i in range(2))
+
+    def stream(next, controller, action, **params):
+        return Stream(log.append(i) or i for i in range(2))
+
+    # ленивый результат без пометки - транзакция завершается сразу
+    result = make_api(transact(Session), lazy).call('Controller', 'action')
+    assert log == ['commit']
+    assert list(result) == [0, 1]
+
+    del log[:]
+    result = make_api(transact(Session), stream).call('Controller', 'action')
+    assert log == []
+    assert list(result) == [0, 1]
+    assert log == [0, 1, 'commit']
+
+
+def test_transact_closed_stream():
+    log = []
+
+    class Session:
+        commit = staticmethod(lambda: log.append('commit'))
+        rollback = staticmethod(lambda: log.append('rollback'))
+
+    def stream(next, controller, action, **params):
+        return Stream(log.append(i) or i for i in range(5))
+
+    result = make_api(transact(Session), stream).call('Controller', 'action')
+    assert next(result) == 0
+    # закрытие недочитанного результата сразу завершает транзакцию
+    result.close()
+    assert log == [0, 'rollback']
@@ -1,5 +1,7 @@
 # coding: utf-8
 
+from copy import deepcopy
+
 from pynch.core import init, ModuleContainer, iter_frontends
 from pynch.controller import Controller
 
@@ -109,7 +111,9 @@ config = {
 
 
 def make_api():
-    return init(config, container_clz=Container, get_config=lambda x: x)
+    # yadic изменяет конфигурацию при нормализации
+    return init(
+        deepcopy(config), container_clz=Container, get_config=lambda x: x)
 
 
 def test_module_container():
@@ -133,3 +137,15 @@ def test_iter_api():
         'module/call',
         'm/MathController/call',
     ]
+
+
+def test_path_resolution_cache():
+    api = make_api()
+
+    cont = api._container.get('module', 'm')._container
+    lib = cont.get('lib', '../libs/math')
+    assert lib is cont.get('lib', '../libs/math')
+    assert cont._names == {'../libs/math': ('../libs', 'math')}
+    assert cont._targets == {
+        '../libs': api._container.get('module', 'libs')._container
+    }
@@ -1,14 +1,20 @@
 # coding:utf-8
 
-from pytest import raises
+from pytest import mark, raises
 
-from pynch.router import Router, RoutingError
+from pynch.router import Router, RoutesRouter, CachingRouter, RoutingError
 
 
-def test_router():
+@mark.parametrize('router_clz', [
+    Router,
+    RoutesRouter,
+    lambda: CachingRouter(RoutesRouter()),
+    lambda: CachingRouter(Router(), size=2),
+])
+def test_router(router_clz):
     """Tests the Router"""
 
-    router = Router()
+    router = router_clz()
     router.register('GET', '/calc/{x}/{y}/sum', 'calc', 'sum')
     router.register(('GET', 'POST'), '/calc/{n}/double', 'calc', 'double')
     router.register('*', '/misc/echo', 'misc', 'echo')
@@ -40,3 +46,47 @@ def test_router():
 
     with raises(RoutingError):
         r('PUT', '/calc/42/double')
+
+
+@mark.parametrize('router_clz', [Router, RoutesRouter])
+def test_router_priority(router_clz):
+    """Tests the priority of the static prefixes"""
+
+    router = router_clz()
+    router.register('GET', '/a/{x}', 'a', 'var')
+    router.register('GET', '/a/b', 'a', 'static')
+    router.register('GET', '/module{subroute}', 'module', 'call')
+    router.register('POST', r'/update/{id_:\d+}', 'a', 'update')
+    r = router.route
+
+    assert r('GET', '/a/b') == ('a', 'static', {})
+    assert r('GET', '/a/c') == ('a', 'var', {'x': 'c'})
+    assert r('GET', '/module/sub/read') == (
+        'module', 'call', {'subroute': '/sub/read'})
+    assert r('POST', '/update/42') == ('a', 'update', {'id_': '42'})
+
+    with raises(RoutingError):
+        r('GET', '/a')
+
+
+def test_caching_router():
+    """Tests the routing cache"""
+
+    router = CachingRouter(size=2)
+    router.register('GET', '/calc/{x}/double', 'calc', 'double')
+
+    result = router.route('GET', '/calc/1/double')
+    result[2]['y'] = 'mutated'
+    assert router.route('GET', '/calc/1/double') == (
+        'calc', 'double', {'x': '1'})
+
+    router.route('GET', '/calc/2/double')
+    router.route('GET', '/calc/3/double')
+    with raises(RoutingError):
+        router.route('GET', '/calc')
+
+    info = router.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 4, 2)
+
+    router.register('GET', '/calc', 'calc', 'index')
+    assert router.route('GET', '/calc') == ('calc', 'index', {})
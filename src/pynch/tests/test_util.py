@@ -3,7 +3,10 @@
 import tempfile
 import json
 
-from pynch.util import load_configs
+import pytest
+
+from pynch import util
+from pynch.util import load_configs, JSON_CODECS, TTLCache
 
 
 def _write_dump(data, fobj):
@@ -69,3 +72,62 @@ def test_config_loader():
                     }
                 }
             }
+
+
+@pytest.mark.parametrize('name', sorted(JSON_CODECS))
+def test_json_codecs(name):
+    """
+    Тестирует кодирование/декодирование json всеми кодеками
+    """
+    if name == 'orjson':
+        pytest.importorskip('orjson')
+    codec = JSON_CODECS[name]()
+
+    data = {'data': map(str, range(3)), 'success': True}
+    assert json.loads(codec.dumps(data).decode('utf-8')) == {
+        'data': ['0', '1', '2'], 'success': True
+    }
+    assert codec.loads(b'{"filter": [1, 2]}') == {'filter': [1, 2]}
+    assert codec.loads('[{"a": "b"}]') == [{'a': 'b'}]
+
+    with pytest.raises(codec.decode_error):
+        codec.loads(b'a=1&b=2')
+
+    with pytest.raises(TypeError):
+        codec.dumps(object())
+
+
+def test_json_codec_selection(monkeypatch):
+    """
+    Тестирует выбор кодека через $PYNCH_JSON_CODEC
+    """
+    monkeypatch.setattr(util, '_json_codec', None)
+    monkeypatch.setenv('PYNCH_JSON_CODEC', 'json')
+    assert isinstance(util.get_json_codec(), util.JSONCodec)
+
+    with pytest.raises(RuntimeError):
+        util.set_json_codec('unknown')
+
+
+def test_ttl_cache():
+    """
+    Тестирует вытеснение записей из TTLCache по времени и размеру
+    """
+    now = [0]
+    cache = TTLCache(size=2, ttl=10, clock=lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+
+    # вытесняется давно не использовавшаяся запись
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+
+    now[0] = 10
+    assert cache.get('a', 'expired') == 'expired'
+    assert len(cache) == 1
+
+    cache.set('a', 1)
+    cache.pop('a')
+    assert cache.get('a') is None
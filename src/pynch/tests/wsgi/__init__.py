@@ -37,3 +37,5 @@ class MockFrontend:
             return params
         elif key == '/wrong-serialize':
             return object()
+        elif key == '/lazy-data':
+            return ({'id': i} for i in range(int(params['count'])))
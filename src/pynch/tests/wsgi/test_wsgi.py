@@ -6,6 +6,8 @@ import json
 import pytest
 from webob import Request
 
+from pynch import wsgi
+from pynch.util import Stream, get_json_codec
 from pynch.wsgi import handler
 
 
@@ -180,3 +182,41 @@ def test_wrong_cookies():
     assert data['_some-cookies'] is None
     assert 'a' not in data
     assert 'b' not in data
+
+
+@pytest.mark.parametrize('count', [0, 3, 7])
+def test_streaming(count, monkeypatch):
+    monkeypatch.setattr(wsgi, 'STREAM_CHUNK_SIZE', 2)
+    os.environ['PYNCH_CONFIG'] = os.path.join(
+        os.path.dirname(__file__),
+        'container.json'
+    )
+    app = handler(config_file_name='$PYNCH_CONFIG', streaming=True)
+
+    response = Request.blank('/lazy-data?count=%d' % count).get_response(app)
+    assert response.status_code == 200
+    assert response.json == {
+        'data': [{'id': i} for i in range(count)],
+        'success': True
+    }
+
+    response = Request.blank('/controller/with_data?a=1').get_response(app)
+    assert response.json['data'] == {'a': '1'}
+
+
+def test_streaming_close():
+    closed = []
+
+    def rows():
+        try:
+            yield {'id': 1}
+            yield {'id': 2}
+        finally:
+            closed.append(True)
+
+    app_iter = wsgi._iter_json(Stream(rows()), 1, get_json_codec())
+    assert next(app_iter) == b'{"data": ['
+    next(app_iter)
+    # сервер закрывает app_iter, не дочитав ответ
+    app_iter.close()
+    assert closed == [True]
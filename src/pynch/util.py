@@ -2,10 +2,18 @@
 """Набор вспомогательных конструкций."""
 import os
 import json
+import threading
+import time
+from collections import OrderedDict
 from types import GeneratorType
 
 from yadic.util import merge
 
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
 
 def serialize_to_json(obj):
     """
@@ -15,12 +23,194 @@ def serialize_to_json(obj):
     :param obj: Объект, который необходимо серриализовать в json
     :return:
     """
-    if isinstance(obj, (map, set, GeneratorType)):
+    if isinstance(obj, (map, set, GeneratorType, Stream)):
         return tuple(obj)
     else:
         raise TypeError('Type "{0}" not supported'.format(obj))
 
 
+class Stream:
+
+    """
+    Ленивый результат, читающий данные из открытого курсора.
+
+    Транзакция (mw transact) для такого результата завершается
+    только после его полного получения
+    """
+
+    def __init__(self, iterable):
+        """.
+
+        :param iterable: Итерируемый объект с данными
+        """
+        self._iterator = iter(iterable)
+
+    def __iter__(self):
+        """."""
+        return self
+
+    def __next__(self):
+        """."""
+        return next(self._iterator)
+
+    def close(self):
+        """Прерывает чтение, закрывая вложенный итератор (если умеет)."""
+        close = getattr(self._iterator, 'close', None)
+        if close is not None:
+            close()
+
+
+class JSONCodec:
+
+    """JSON-кодек на основе стандартной библиотеки."""
+
+    # исключение, возбуждаемое при разборе некорректных данных
+    decode_error = ValueError
+
+    @staticmethod
+    def loads(data):
+        """
+        Разбирает json из строки или байт.
+
+        :param data: json-представление
+        :return: Объект
+        """
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(obj, default=serialize_to_json, pretty=False):
+        """
+        Возвращает json-представление объекта в виде байт (utf-8).
+
+        :param obj: Объект
+        :param default: функция серриализации неподдерживаемых объектов
+        :param pretty: форматировать ли вывод отступами
+        :return bytes:
+        """
+        return json.dumps(
+            obj, default=default, indent=2 if pretty else None
+        ).encode('utf-8')
+
+
+class OrJSONCodec:
+
+    """JSON-кодек на основе orjson (требует установки пакета)."""
+
+    decode_error = ValueError
+
+    def __init__(self):
+        """Проверяет наличие orjson."""
+        if _orjson is None:
+            raise RuntimeError('Package "orjson" is not installed!')
+
+    @staticmethod
+    def loads(data):
+        """См. JSONCodec.loads."""
+        return _orjson.loads(data)
+
+    @staticmethod
+    def dumps(obj, default=serialize_to_json, pretty=False):
+        """См. JSONCodec.dumps."""
+        option = _orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= _orjson.OPT_INDENT_2
+        return _orjson.dumps(obj, default=default, option=option)
+
+
+JSON_CODECS = {
+    'json': JSONCodec,
+    'orjson': OrJSONCodec,
+}
+
+_json_codec = None
+
+
+def set_json_codec(name):
+    """
+    Устанавливает JSON-кодек, используемый пакетом.
+
+    :param name: наименование кодека из JSON_CODECS
+    """
+    global _json_codec
+    try:
+        codec_clz = JSON_CODECS[name]
+    except KeyError:
+        raise RuntimeError('Unknown JSON codec: %r!' % name)
+    _json_codec = codec_clz()
+
+
+def get_json_codec():
+    """
+    Возвращает JSON-кодек, используемый пакетом.
+
+    По умолчанию кодек задаётся переменной окружения $PYNCH_JSON_CODEC
+    ("json", если переменная не указана)
+    """
+    if _json_codec is None:
+        set_json_codec(os.environ.get('PYNCH_JSON_CODEC', 'json'))
+    return _json_codec
+
+
+class TTLCache:
+
+    """
+    LRU-кэш с ограниченным временем жизни записей.
+
+    Устаревшие записи удаляются при обращении к ним,
+    при переполнении удаляются давно не использовавшиеся
+    """
+
+    def __init__(self, size=1024, ttl=60, clock=time.monotonic):
+        """.
+
+        :param size: Максимальное кол-во записей
+        :param ttl: Время жизни записи в секундах
+        :param clock: Функция текущего времени
+        """
+        self.size = size
+        self.ttl = ttl
+        self._clock = clock
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Возвращает значение по ключу или default."""
+        with self._lock:
+            try:
+                expires, value = self._items[key]
+            except KeyError:
+                return default
+            if expires <= self._clock():
+                del self._items[key]
+                return default
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Сохраняет значение по ключу (на ttl секунд, если указано)."""
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            self._items[key] = (self._clock() + ttl, value)
+            self._items.move_to_end(key)
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def pop(self, key):
+        """Удаляет запись по ключу."""
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        """Удаляет все записи."""
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        """Кол-во записей (в т.ч. устаревших)."""
+        return len(self._items)
+
+
 def load_configs(fnames, parser=json.load):
     """
     Загружает список конфигурационных файлов.
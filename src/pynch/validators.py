@@ -1,11 +1,10 @@
 # coding: utf-8
 """Валидаторы"""
-import json
-
 from pynch import exceptions as exc
+from pynch.util import get_json_codec
 
 
-__all__ = ('VALIDATORS',)
+__all__ = ('VALIDATORS', 'get_validator', 'ValidationPlan')
 
 
 class Validator:
@@ -52,7 +51,9 @@ class StringValidator(Validator):
 
 
 class ObjectValidator(Validator):
-    validate = staticmethod(json.loads)
+    @staticmethod
+    def validate(value):
+        return get_json_codec().loads(value)
 
 
 class AsIsValidator(Validator):
@@ -60,6 +61,15 @@ class AsIsValidator(Validator):
     validate = staticmethod(lambda x: x)
 
 
+class UnsupportedValidator(Validator):
+    """Валидатор параметра, для формата которого нет реализации."""
+
+    def validate(self, value):
+        raise exc.ValidationError(
+            'Format %r of parameter "%s" is not supported!' % (
+                self.format, self.name))
+
+
 VALIDATORS = {
     'integer': {
         'default': IntegerValidator
@@ -75,3 +85,65 @@ VALIDATORS = {
         'default': FloatValidator
     },
 }
+
+
+def get_validator(param):
+    """
+    Возвращает экземпляр валидатора для описания параметра.
+
+    :param param: описание параметра в формате swagger
+    :type param: dict
+    """
+    try:
+        validator = VALIDATORS[param['type']]
+        validator = validator.get(param.get('format'), validator['default'])
+        # форматы без реализации (None) - ошибка при вызове экшна
+        return (validator or UnsupportedValidator)(**param)
+    except KeyError:
+        raise exc.ValidationError(
+            'Unknown parameter type: %r' % param.get('type')
+        )
+
+
+class ValidationPlan:
+    """
+    Скомпилированный план валидации параметров экшна.
+
+    Валидаторы создаются однократно, параметры заранее разделяются
+    на параметры пути и параметры запроса.
+    """
+
+    def __init__(self, param_spec):
+        """.
+
+        :param param_spec: список описаний параметров в формате swagger
+        :type param_spec: list
+        """
+        self.path, self.query = [], []
+        self.required = set()
+        for param in param_spec:
+            validate = get_validator(param)
+            # TODO: дореализовать обработку параметров
+            # в теле запроса и проч
+            assert param['in'] in {'path', 'query'}
+            (self.path if param['in'] == 'path' else self.query).append(
+                (validate.name, validate))
+            if validate.required:
+                self.required.add(validate.name)
+
+    def __call__(self, path_params, query_params):
+        """
+        Возвращает словарь провалидированных параметров.
+
+        Валидаторы перемещают параметры из входных словарей в выходной
+        """
+        out_params = {}
+        for steps, in_dict in (
+            (self.path, path_params),
+            (self.query, query_params)
+        ):
+            for name, validate in steps:
+                # отсутствующие необязательные параметры пропускаются
+                if name in in_dict or name in self.required:
+                    validate(in_dict=in_dict, out_dict=out_params)
+        return out_params
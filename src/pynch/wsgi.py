@@ -2,35 +2,70 @@
 """Функционал для работы уровня WSGI."""
 
 from datetime import datetime
-import json
 from os import path
 from sys import stderr, exc_info
 import traceback
+from types import GeneratorType
 from uuid import uuid4
 
-from simplejson.scanner import JSONDecodeError
-
 from webob import Response, exc
 from webob.dec import wsgify
 from webob.static import DirectoryApp
 
 from pynch import core, exceptions
 from pynch.router import RoutingError
-from pynch.util import serialize_to_json
+from pynch.util import Stream, get_json_codec
+
+
+# Кол-во элементов результата, кодируемых в одну порцию ответа
+STREAM_CHUNK_SIZE = 500
+
+
+def _iter_json(result, chunk_size, codec):
+    """
+    Возвращает итератор порций json-представления успешного ответа.
 
+    Элементы результата кодируются по мере получения из итератора,
+    поэтому ни результат, ни тело ответа не хранятся в памяти целиком.
+    Закрытие итератора сервером (например, при обрыве соединения)
+    закрывает и сам результат
+    """
+    try:
+        yield b'{"data": ['
+        sep, chunk = b'', []
+        for item in result:
+            chunk.append(codec.dumps(item))
+            if len(chunk) >= chunk_size:
+                yield sep + b', '.join(chunk)
+                sep, chunk = b', ', []
+        if chunk:
+            yield sep + b', '.join(chunk)
+        yield b'], "success": true}'
+    finally:
+        close = getattr(result, 'close', None)
+        if close is not None:
+            close()
+
+
+def handler(config_file_name, catch_cookies=None, streaming=False):
+    """
+    Обработчик HTTP-запросов к приложению.
 
-def handler(config_file_name, catch_cookies=None):
-    """Обработчик HTTP-запросов к приложению."""
+    :param streaming: отдавать ленивые результаты (map, генераторы)
+    по частям, не формируя тело ответа целиком. Ошибки, возникшие
+    при получении элементов, в этом режиме не меняют статус ответа
+    """
     fend = core.init(config=config_file_name)
     catch_cookies = catch_cookies or []
+    codec = get_json_codec()
 
     @wsgify
     def app(request):
         params = {}
 
         try:
-            params.update(request.json)
-        except JSONDecodeError:
+            params.update(codec.loads(request.body))
+        except codec.decode_error:
             params.update(request.params)
 
         for cookie in catch_cookies:
@@ -59,11 +94,17 @@ def handler(config_file_name, catch_cookies=None):
             status, result = 404, e
 
         if status == 200:
-            body = json.dumps({'data': result,
-                               'success': True},
-                              default=serialize_to_json)
+            if streaming and isinstance(
+                    result, (map, GeneratorType, Stream)):
+                return Response(
+                    content_type='application/json',
+                    app_iter=_iter_json(result, STREAM_CHUNK_SIZE, codec),
+                    status=status
+                )
+            body = codec.dumps({'data': result,
+                                'success': True})
         else:
-            body = json.dumps(getattr(result, 'values', str(result)))
+            body = codec.dumps(getattr(result, 'values', str(result)))
 
         return Response(
             content_type='application/json',